@@ -1,3 +1,3 @@
-from app.api.routes import health, webhook
+from app.api.routes import admin, health, metrics, webhook
 
-__all__ = ["health", "webhook"]
+__all__ = ["admin", "health", "metrics", "webhook"]
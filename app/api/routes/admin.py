@@ -0,0 +1,47 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Header
+
+from app.config import settings
+from app.utils.profiling import profiling_state
+
+router = APIRouter()
+
+
+def verify_admin_token(token: Optional[str]) -> None:
+    """管理APIトークン検証（ADMIN_TOKEN未設定時は管理APIを無効化）"""
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token or not hmac.compare_digest(token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.get("/admin/profiling")
+async def get_profiling(x_admin_token: str = Header(None, alias="X-Admin-Token")):
+    """プロファイリング設定の確認"""
+    verify_admin_token(x_admin_token)
+    return {
+        "enabled": profiling_state.enabled,
+        "mode": profiling_state.mode,
+        "active": profiling_state.active,
+        "dir": settings.profiling_dir,
+        "slow_request_ms": settings.profiling_slow_request_ms,
+    }
+
+
+@router.post("/admin/profiling")
+async def set_profiling(
+    enabled: bool,
+    mode: Optional[str] = None,
+    x_admin_token: str = Header(None, alias="X-Admin-Token"),
+):
+    """プロファイリングのON/OFF切り替え（再デプロイ不要）"""
+    verify_admin_token(x_admin_token)
+    if mode is not None:
+        if mode not in ("sampling", "deterministic"):
+            raise HTTPException(status_code=400, detail="mode must be 'sampling' or 'deterministic'")
+        profiling_state.mode = mode
+    profiling_state.enabled = enabled
+    print(f"[Profiling] enabled={enabled} mode={profiling_state.mode}")
+    return await get_profiling(x_admin_token)
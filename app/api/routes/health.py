@@ -1,4 +1,8 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.models.database import get_pool_status, ping_db
+from app.utils.circuit_breaker import get_circuit_breaker_states
 
 router = APIRouter()
 
@@ -8,3 +12,25 @@ router = APIRouter()
 async def health_check():
     """ヘルスチェックエンドポイント（Railway/Render監視用）"""
     return {"status": "healthy"}
+
+
+@router.get("/health/ready")
+async def readiness_check():
+    """レディネスチェック（DB疎通とコネクションプールの状態）
+
+    外部ソースのサーキットブレーカーの状態も返す（openでも前回の結果で配信できるため ready のまま）。
+    """
+    pool = get_pool_status()
+    try:
+        latency_ms = await ping_db()
+    except Exception as e:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unavailable", "db": {"error": type(e).__name__}, "pool": pool},
+        )
+    return {
+        "status": "ready",
+        "db": {"ping_ms": round(latency_ms, 2)},
+        "pool": get_pool_status(),
+        "circuit_breakers": get_circuit_breaker_states(),
+    }
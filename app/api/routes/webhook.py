@@ -1,24 +1,27 @@
 import hashlib
 import hmac
 import base64
+import time
+from typing import Optional
+
 from fastapi import APIRouter, Request, HTTPException, Header
 
 from app.config import settings
 from app.services.line_service import (
-    handler,
     register_user,
     deactivate_user,
-    send_text_message,
-    send_flex_message,
+    EventReply,
     add_favorite,
     remove_favorite,
-    get_user_favorites,
+    get_user_favorites_page,
     ensure_user_registered,
     get_user_settings,
     update_user_delivery_hour,
     toggle_user_category,
     update_user_language,
 )
+from app.services.event_dedup import event_deduplicator
+from app.utils import json_codec
 from app.utils.flex_message import (
     create_favorites_list,
     create_settings_menu,
@@ -27,6 +30,9 @@ from app.utils.flex_message import (
     create_language_selector,
     create_main_menu,
 )
+from app.utils.metrics import WEBHOOK_EVENT_SECONDS
+from app.utils.profiling import profile
+from app.utils.tracing import span
 
 router = APIRouter()
 
@@ -55,15 +61,27 @@ async def webhook(
         raise HTTPException(status_code=400, detail="Invalid signature")
 
     # イベント解析
-    import json
-    events = json.loads(body.decode("utf-8")).get("events", [])
+    events = json_codec.loads(body).get("events", [])
 
-    for event in events:
-        await handle_event(event)
+    async with profile("webhook", threshold_ms=settings.profiling_slow_request_ms):
+        with span("webhook", events=len(events)):
+            for event in events:
+                await handle_event(event)
 
     return {"status": "ok"}
 
 
+def _event_action(event: dict) -> str:
+    """メトリクス用のアクション名（postbackはaction単位）"""
+    event_type = event.get("type") or "unknown"
+    if event_type == "postback":
+        data = event.get("postback", {}).get("data", "")
+        for param in data.split("&"):
+            if param.startswith("action="):
+                return f"postback:{param[len('action='):]}"
+    return event_type
+
+
 async def handle_event(event: dict) -> None:
     """イベントハンドリング"""
     event_type = event.get("type")
@@ -72,8 +90,31 @@ async def handle_event(event: dict) -> None:
     if not user_id:
         return
 
+    # 再送されたイベントはDB処理・外部API呼び出しの前に破棄
+    event_id = event.get("webhookEventId")
+    if not await event_deduplicator.claim(event_id):
+        print(f"Duplicate webhook event dropped: {event_id}")
+        return
+
+    action = _event_action(event)
+    started = time.perf_counter()
+    try:
+        with span("handle_event", action=action):
+            reply = EventReply.for_event(event, user_id)
+            await _dispatch_event(event, event_type, user_id, reply)
+            # ハンドラーが積んだメッセージを1回のreply_messageで送る
+            await reply.send()
+    except Exception:
+        await event_deduplicator.release(event_id)
+        raise
+    finally:
+        WEBHOOK_EVENT_SECONDS.observe(time.perf_counter() - started, action=action)
+
+
+async def _dispatch_event(event: dict, event_type: str, user_id: str, reply: EventReply) -> None:
+    """イベント種別ごとの処理に振り分け"""
     if event_type == "follow":
-        await handle_follow(user_id)
+        await handle_follow(user_id, reply)
 
     elif event_type == "unfollow":
         await handle_unfollow(user_id)
@@ -81,26 +122,25 @@ async def handle_event(event: dict) -> None:
     elif event_type == "message":
         # メッセージ受信時にユーザーを自動登録（未登録の場合）
         await ensure_user_registered(user_id)
-        await handle_message(event, user_id)
+        await handle_message(event, reply)
 
     elif event_type == "postback":
         # Postback時もユーザーを自動登録
         await ensure_user_registered(user_id)
-        await handle_postback(event, user_id)
+        await handle_postback(event, user_id, reply)
 
 
-async def handle_follow(user_id: str) -> None:
+async def handle_follow(user_id: str, reply: EventReply) -> None:
     """フォローイベント処理"""
     await register_user(user_id)
-    await send_text_message(
-        user_id,
+    reply.text(
         "友だち追加ありがとうございます!\n\n"
         "毎朝8時にAI技術の最新ニュースTOP5をお届けします。\n\n"
         "何かメッセージを送ると、メニューが表示されます。"
     )
     # メインメニューを表示
     flex_content = create_main_menu()
-    await send_flex_message(user_id, "メニュー", flex_content)
+    reply.flex("メニュー", flex_content)
 
 
 async def handle_unfollow(user_id: str) -> None:
@@ -108,7 +148,7 @@ async def handle_unfollow(user_id: str) -> None:
     await deactivate_user(user_id)
 
 
-async def handle_message(event: dict, user_id: str) -> None:
+async def handle_message(event: dict, reply: EventReply) -> None:
     """メッセージイベント処理 - テキスト入力時はメインメニューを表示"""
     message = event.get("message", {})
     message_type = message.get("type")
@@ -118,72 +158,78 @@ async def handle_message(event: dict, user_id: str) -> None:
 
     # どんなテキストでもメインメニューを表示
     flex_content = create_main_menu()
-    await send_flex_message(user_id, "メニュー", flex_content)
+    reply.flex("メニュー", flex_content)
 
 
-async def handle_postback(event: dict, user_id: str) -> None:
+async def handle_postback(event: dict, user_id: str, reply: EventReply) -> None:
     """Postbackイベント処理"""
     data = event.get("postback", {}).get("data", "")
     params = dict(param.split("=") for param in data.split("&") if "=" in param)
 
+    with span("handle_postback", action=params.get("action", "")):
+        await _handle_postback_action(params, user_id, reply)
+
+
+async def _handle_postback_action(params: dict, user_id: str, reply: EventReply) -> None:
+    """Postbackのactionごとの処理"""
     action = params.get("action")
     article_id = params.get("article_id")
 
     if action == "favorite" and article_id:
         success, reason = await add_favorite(user_id, article_id)
         if success:
-            await send_text_message(user_id, "お気に入りに追加しました!")
+            reply.text("お気に入りに追加しました!")
         else:
             if reason == "user_not_found":
-                await send_text_message(user_id, "ユーザー情報が見つかりません。友だち追加し直してください。")
+                reply.text("ユーザー情報が見つかりません。友だち追加し直してください。")
             elif reason == "article_not_found":
-                await send_text_message(user_id, "記事が見つかりません。再度ニュースを取得してからお試しください。")
+                reply.text("記事が見つかりません。再度ニュースを取得してからお試しください。")
             elif reason == "already_favorited":
-                await send_text_message(user_id, "この記事は既にお気に入りに追加済みです。")
+                reply.text("この記事は既にお気に入りに追加済みです。")
             else:
-                await send_text_message(user_id, "お気に入りの追加に失敗しました。")
+                reply.text("お気に入りの追加に失敗しました。")
 
     elif action == "unfavorite" and article_id:
         success = await remove_favorite(user_id, article_id)
         if success:
-            await send_text_message(user_id, "お気に入りから削除しました。")
+            reply.text("お気に入りから削除しました。")
         else:
-            await send_text_message(user_id, "削除に失敗しました。")
+            reply.text("削除に失敗しました。")
 
     elif action == "show_favorites":
-        await show_favorites(user_id)
+        await show_favorites(user_id, reply, params.get("cursor"))
 
     elif action == "today_news":
         from app.services.scheduler import send_daily_news_to_user
-        await send_daily_news_to_user(user_id)
+        await send_daily_news_to_user(user_id, reply)
 
     elif action == "help":
-        await send_help(user_id)
+        send_help(reply)
 
     # ========== 設定関連 ==========
     elif action == "settings":
-        await show_settings(user_id)
+        await show_settings(user_id, reply)
 
     elif action == "show_time_selector":
         flex_content = create_time_selector()
-        await send_flex_message(user_id, "配信時間を選択", flex_content)
+        reply.flex("配信時間を選択", flex_content)
 
     elif action == "set_hour":
         hour = int(params.get("hour", 8))
         success = await update_user_delivery_hour(user_id, hour)
         if success:
-            await send_text_message(user_id, f"配信時間を {hour}:00 に設定しました。")
-            await show_settings(user_id)
+            reply.text(f"配信時間を {hour}:00 に設定しました。")
+            await show_settings(user_id, reply)
         else:
-            await send_text_message(user_id, "設定の更新に失敗しました。")
+            reply.text("設定の更新に失敗しました。")
 
     elif action == "show_category_selector":
         user_settings = await get_user_settings(user_id)
         if user_settings:
             flex_content = create_category_selector(user_settings)
-            await send_flex_message(user_id, "カテゴリを選択", flex_content)
+            reply.flex("カテゴリを選択", flex_content)
         else:
-            await send_text_message(user_id, "設定の取得に失敗しました。")
+            reply.text("設定の取得に失敗しました。")
 
     elif action == "toggle_category":
         category = params.get("category", "")
@@ -192,22 +238,22 @@ async def handle_postback(event: dict, user_id: str) -> None:
             from app.models.user_settings import CATEGORY_LABELS
             cat_label = CATEGORY_LABELS.get(category, category)
             state_text = "ON" if new_state else "OFF"
-            await send_text_message(user_id, f"「{cat_label}」を {state_text} にしました。")
+            reply.text(f"「{cat_label}」を {state_text} にしました。")
             # カテゴリ選択画面を再表示
             user_settings = await get_user_settings(user_id)
             if user_settings:
                 flex_content = create_category_selector(user_settings)
-                await send_flex_message(user_id, "カテゴリを選択", flex_content)
+                reply.flex("カテゴリを選択", flex_content)
         else:
-            await send_text_message(user_id, "設定の更新に失敗しました。")
+            reply.text("設定の更新に失敗しました。")
 
     elif action == "show_language_selector":
         user_settings = await get_user_settings(user_id)
         if user_settings:
             flex_content = create_language_selector(user_settings)
-            await send_flex_message(user_id, "言語を選択", flex_content)
+            reply.flex("言語を選択", flex_content)
         else:
-            await send_text_message(user_id, "設定の取得に失敗しました。")
+            reply.text("設定の取得に失敗しました。")
 
     elif action == "set_language":
         lang = params.get("lang", "both")
@@ -215,39 +261,40 @@ async def handle_postback(event: dict, user_id: str) -> None:
         if success:
             from app.models.user_settings import LANGUAGE_LABELS
             lang_label = LANGUAGE_LABELS.get(lang, lang)
-            await send_text_message(user_id, f"言語設定を「{lang_label}」に変更しました。")
-            await show_settings(user_id)
+            reply.text(f"言語設定を「{lang_label}」に変更しました。")
+            await show_settings(user_id, reply)
         else:
-            await send_text_message(user_id, "設定の更新に失敗しました。")
+            reply.text("設定の更新に失敗しました。")
 
 
-async def show_favorites(user_id: str) -> None:
-    """お気に入り一覧表示"""
-    from app.services.line_service import send_flex_message
-    articles = await get_user_favorites(user_id)
+async def show_favorites(user_id: str, reply: EventReply, cursor: Optional[str] = None) -> None:
+    """お気に入り一覧表示（cursor指定時は続きのページ）"""
+    articles, next_cursor = await get_user_favorites_page(user_id, cursor)
 
     if not articles:
-        await send_text_message(user_id, "お気に入りはまだありません。\n記事の「保存」ボタンで追加できます。")
+        if cursor:
+            reply.text("これ以上お気に入りはありません。")
+        else:
+            reply.text("お気に入りはまだありません。\n記事の「保存」ボタンで追加できます。")
         return
 
-    flex_content = create_favorites_list(articles)
-    await send_flex_message(user_id, "お気に入り一覧", flex_content)
+    flex_content = create_favorites_list(articles, next_cursor)
+    reply.flex("お気に入り一覧", flex_content)
 
 
-async def show_settings(user_id: str) -> None:
+async def show_settings(user_id: str, reply: EventReply) -> None:
     """設定メニュー表示"""
     user_settings = await get_user_settings(user_id)
     if user_settings:
         flex_content = create_settings_menu(user_settings)
-        await send_flex_message(user_id, "設定", flex_content)
+        reply.flex("設定", flex_content)
     else:
-        await send_text_message(user_id, "設定の取得に失敗しました。")
+        reply.text("設定の取得に失敗しました。")
 
 
-async def send_help(user_id: str) -> None:
+def send_help(reply: EventReply) -> None:
     """ヘルプメッセージ送信"""
-    await send_text_message(
-        user_id,
+    reply.text(
         "AI News Botの使い方\n\n"
         "【自動配信】\n"
         "設定した時間にAI技術の最新ニュースをお届けします。\n\n"
@@ -7,9 +7,22 @@ class Settings(BaseSettings):
     # LINE Messaging API
     line_channel_access_token: str = ""
     line_channel_secret: str = ""
+    line_reply_token_ttl_seconds: int = 60  # これより古いイベントのreplyTokenは使わずpushで送る
 
     # Database
     database_url: str = "sqlite+aiosqlite:///./dev.db"
+    db_echo: bool = False  # SQLログ出力
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30  # コネクション取得待ちの上限（秒）
+    db_pool_recycle: int = 1800  # コネクションの再作成間隔（秒）
+    db_auto_migrate: bool = True  # 起動時に alembic upgrade head を実行
+
+    # SQLite PRAGMA（空文字で未設定）
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_cache_size: int = -16000  # 負数はKiB単位
+    sqlite_busy_timeout_ms: int = 5000
 
     @field_validator("database_url", mode="after")
     @classmethod
@@ -24,6 +37,7 @@ class Settings(BaseSettings):
     # Application
     app_env: str = "development"
     debug: bool = True
+    json_codec: str = "auto"  # "auto"（orjsonがあれば使う） / "orjson" / "json"
 
     # Scheduler
     daily_delivery_hour: int = 8
@@ -33,6 +47,61 @@ class Settings(BaseSettings):
     # Article Settings
     max_articles_per_delivery: int = 5
     article_fetch_hours: int = 24
+    article_retention_days: int = 30  # お気に入りされていない記事の保持期間
+    article_retention_batch_size: int = 1000
+    article_retention_hour: int = 4  # 保持期間切れ記事の削除ジョブ実行時刻
+
+    # Scheduler leader election（複数ワーカーで配信ジョブを1プロセスだけが実行する）
+    # 有効時は配信対象を毎回DBから取得する（インメモリの配信対象インデックスは単一ワーカー時のみ）
+    scheduler_leader_election: bool = False
+    scheduler_lease_seconds: int = 30  # リーダー不在を検知して引き継ぐまでの時間
+
+    # Webhook redelivery dedup（webhookEventId）
+    webhook_dedup_backend: str = "memory"  # "memory" or "db"（複数ワーカー時）
+    webhook_dedup_lru_size: int = 10_000
+    webhook_dedup_ttl_seconds: int = 86_400
+
+    # Startup
+    startup_warmup: bool = True  # 起動後に重いモジュールをバックグラウンドで読み込む
+
+    # Feed parsing（イベントループ外のワーカーで実行）
+    feed_parse_executor: str = "thread"  # "thread" or "process"
+    feed_parse_workers: int = 2
+    feed_max_bytes: int = 5_000_000  # これを超えるフィードは途中で打ち切る
+
+    # Circuit breaker（外部ホスト・フィードごと。openの間は最後に成功した結果を返す）
+    circuit_breaker_failure_threshold: int = 5  # 連続でこの回数失敗したら呼び出しを止める
+    circuit_breaker_reset_seconds: float = 60.0  # 止めてから試しに呼び出すまでの時間
+    circuit_breaker_max_reset_seconds: float = 1800.0  # 試行に失敗するたびに倍にする時間の上限
+    circuit_breaker_fallback_size: int = 10_000  # ブレーカーごとに保持する「最後に成功した結果」の件数
+
+    # Ranking
+    ranking_half_life_hours: float = 24.0  # 人気スコアが半減する経過時間（0で減衰なし）
+    ranking_mode: str = "popularity"  # "popularity"（累計値）or "trending"（増加速度）
+    trending_window_hours: float = 6.0  # 増加速度を測る時間窓
+    social_sample_interval_minutes: int = 30  # 同じ記事の指標を再記録する最短間隔
+    social_sample_raw_hours: int = 48  # これより古いサンプルは記事ごと1日1点に間引く
+
+    # Delivery
+    recipient_batch_size: int = 500  # 配信対象ユーザーのストリーミング取得単位
+    news_snapshot_max_age_seconds: int = 900  # 「今日のニュース」はこれより新しいスナップショットをそのまま返す
+    delivery_history_enabled: bool = True  # 配信済みの記事を同じユーザーに再送しない
+    delivery_history_days: int = 7  # 配信済みとして覚えておく期間（この1〜2倍の期間で忘れる）
+    delivery_history_bits: int = 2048  # ユーザーごとのBloomフィルタ1世代のビット数
+
+    # Tracing ("none", "console", "file")
+    tracing_exporter: str = "none"
+    tracing_file_path: str = "./traces.jsonl"  # OTLP/JSON Lines
+
+    # Profiling
+    profiling_enabled: bool = False
+    profiling_mode: str = "sampling"  # "sampling" or "deterministic"
+    profiling_dir: str = "./profiles"
+    profiling_sample_interval_ms: int = 5
+    profiling_slow_request_ms: int = 3000  # これより遅いwebhookリクエストのみ出力
+
+    # Admin API（空の場合は無効）
+    admin_token: str = ""
 
     class Config:
         env_file = ".env"
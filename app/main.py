@@ -1,21 +1,85 @@
+import time
+
+# 起動時間レポートの起点（uvicornがこのモジュールをimportし始めた時刻）
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import importlib
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
 from app.config import settings
-from app.api.routes import health, webhook
-from app.models.database import init_db
-from app.services.scheduler import setup_scheduler, shutdown_scheduler
+from app.api.routes import admin, health, metrics, webhook
+from app.models.database import dispose_engine, init_db
+from app.services.line_service import close_messaging_api
+from app.services.news_collector import shutdown_parse_executor
+from app.services.recipient_index import recipient_index
+from app.services.scheduler import scheduler_leader, setup_scheduler, shutdown_scheduler
+from app.utils import tracing
+from app.utils.metrics import STARTUP_PHASE_SECONDS
+
+# 起動後にバックグラウンドで読み込んでおく重いモジュール（最初のwebhook応答を速くする）
+WARMUP_MODULES = ["linebot.v3.messaging"]
+
+
+def _report_startup(label: str, phases: dict) -> None:
+    for phase, seconds in phases.items():
+        STARTUP_PHASE_SECONDS.set(round(seconds, 4), phase=phase)
+    timings = " ".join(f"{phase}={seconds * 1000:.0f}ms" for phase, seconds in phases.items())
+    print(f"[Startup] {label}: {timings}")
+
+
+async def _background_startup() -> None:
+    """リクエスト受付開始後に行う起動処理（スケジューラー・配信対象インデックス・ウォームアップ）"""
+    phases = {}
+    try:
+        started = time.perf_counter()
+        if settings.scheduler_leader_election:
+            # リーダーに選ばれた時点でスケジューラーを起動する
+            scheduler_leader.start()
+        else:
+            setup_scheduler()
+        phases["scheduler"] = time.perf_counter() - started
+
+        # 読み込み完了までは配信ジョブがDBから配信対象を取得する
+        # （リーダー選出時は配信ジョブが常にDBから取得するため読み込まない）
+        if not settings.scheduler_leader_election:
+            started = time.perf_counter()
+            await recipient_index.load()
+            phases["recipient_index"] = time.perf_counter() - started
+
+        if settings.startup_warmup:
+            started = time.perf_counter()
+            for module in WARMUP_MODULES:
+                await asyncio.to_thread(importlib.import_module, module)
+            phases["warmup"] = time.perf_counter() - started
+    except Exception as e:
+        print(f"[Startup] background startup error: {e}")
+    finally:
+        _report_startup("background", phases)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """アプリケーションのライフサイクル管理"""
-    # Startup
+    # Startup（ここまでの時間がリクエスト受付開始までの時間になる）
+    phases = {"import": time.perf_counter() - _IMPORT_STARTED}
+    started = time.perf_counter()
     await init_db()
-    setup_scheduler()
+    phases["init_db"] = time.perf_counter() - started
+    phases["ready"] = time.perf_counter() - _IMPORT_STARTED
+    _report_startup("ready", phases)
+
+    background = asyncio.create_task(_background_startup())
     yield
     # Shutdown
+    background.cancel()
+    await scheduler_leader.stop()
     shutdown_scheduler()
+    shutdown_parse_executor()
+    await close_messaging_api()
+    await dispose_engine()
+    await asyncio.to_thread(tracing.flush)
 
 
 app = FastAPI(
@@ -27,7 +91,9 @@ app = FastAPI(
 
 # ルーター登録
 app.include_router(health.router, tags=["Health"])
+app.include_router(metrics.router, tags=["Metrics"])
 app.include_router(webhook.router, tags=["LINE Webhook"])
+app.include_router(admin.router, tags=["Admin"])
 
 
 @app.get("/")
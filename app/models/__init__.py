@@ -1,19 +1,28 @@
-from app.models.database import Base, engine, async_session, init_db, get_session
+from app.models.database import Base, get_engine, dispose_engine, async_session, init_db, get_session
 from app.models.user import User
 from app.models.article import Article
+from app.models.article_social_sample import ArticleSocialSample
+from app.models.delivery_history import DeliveryHistory
 from app.models.favorite import Favorite
+from app.models.scheduler_lease import SchedulerLease
+from app.models.webhook_event import WebhookEvent
 from app.models.user_settings import UserSettings, CATEGORY_LABELS, LANGUAGE_LABELS, DEFAULT_CATEGORIES
 
 __all__ = [
     "Base",
-    "engine",
+    "get_engine",
+    "dispose_engine",
     "async_session",
     "init_db",
     "get_session",
     "User",
     "Article",
+    "ArticleSocialSample",
+    "DeliveryHistory",
     "Favorite",
+    "SchedulerLease",
     "UserSettings",
+    "WebhookEvent",
     "CATEGORY_LABELS",
     "LANGUAGE_LABELS",
     "DEFAULT_CATEGORIES",
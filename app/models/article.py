@@ -22,7 +22,7 @@ class Article(Base):
     reddit_score = Column(Integer, default=0)
     source_count = Column(Integer, default=1)
 
-    published_at = Column(DateTime, nullable=True)
+    published_at = Column(DateTime, nullable=True, index=True)
     fetched_at = Column(DateTime, default=datetime.utcnow)
 
     favorites = relationship("Favorite", back_populates="article", cascade="all, delete-orphan")
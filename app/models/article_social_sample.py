@@ -0,0 +1,27 @@
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, DateTime, Index
+
+from app.models.database import Base
+
+
+class ArticleSocialSample(Base):
+    """記事ごとのソーシャル指標の時系列（追記のみ。古い点は保持期間ジョブで間引く）"""
+
+    __tablename__ = "article_social_samples"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # 保存されなかった候補記事も記録するため articles への外部キーは張らない
+    article_id = Column(String(64), nullable=False)
+    ts = Column(DateTime, nullable=False, default=datetime.utcnow)
+    hatena = Column(Integer, nullable=False, default=0)
+    hn = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # 記事ごとの時間窓内の最古サンプル取得用
+        Index("ix_article_social_samples_article_ts", "article_id", "ts"),
+        # 保持期間ジョブの範囲削除用
+        Index("ix_article_social_samples_ts", "ts"),
+    )
+
+    def __repr__(self):
+        return f"<ArticleSocialSample(article_id={self.article_id}, ts={self.ts})>"
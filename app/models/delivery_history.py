@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, DateTime, LargeBinary
+
+from app.models.database import Base
+
+
+class DeliveryHistory(Base):
+    """ユーザーごとの配信済み記事（2世代のBloomフィルタ。app.services.delivery_history 参照）"""
+
+    __tablename__ = "delivery_histories"
+
+    line_user_id = Column(String(64), primary_key=True)
+    current_bits = Column(LargeBinary, nullable=False)
+    previous_bits = Column(LargeBinary, nullable=True)
+    current_count = Column(Integer, nullable=False, default=0)
+    rotated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<DeliveryHistory(line_user_id={self.line_user_id}, count={self.current_count})>"
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from app.models.database import Base
@@ -9,7 +9,7 @@ class Favorite(Base):
     __tablename__ = "favorites"
 
     id = Column(String(64), primary_key=True)
-    user_id = Column(String(64), ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(String(64), ForeignKey("users.id"), nullable=False)
     article_id = Column(String(64), ForeignKey("articles.id"), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -17,7 +17,10 @@ class Favorite(Base):
     article = relationship("Article", back_populates="favorites")
 
     __table_args__ = (
+        # user_id単独の検索もこのユニーク制約（先頭列user_id）のインデックスでまかなう
         UniqueConstraint("user_id", "article_id", name="uq_user_article"),
+        # お気に入り一覧のキーセットページング用 (user_id, created_at DESC, id DESC)
+        Index("ix_favorites_user_created_id", "user_id", "created_at", "id"),
     )
 
     def __repr__(self):
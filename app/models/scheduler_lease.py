@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime
+
+from app.models.database import Base
+
+
+class SchedulerLease(Base):
+    """スケジューラーのリーダー選出用のリース（PostgreSQL以外で使用）と、最後に実行した配信枠"""
+
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(64), primary_key=True)
+    holder = Column(String(128), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # 最後に実行したジョブの枠（例: "2026-10-19T08"。リーダー交代時の取りこぼし・二重実行の防止用）
+    last_run_slot = Column(String(32), nullable=True)
+
+    def __repr__(self):
+        return f"<SchedulerLease(name={self.name}, holder={self.holder}, expires_at={self.expires_at})>"
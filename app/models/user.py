@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy import Column, String, Boolean, DateTime, Index, text
 from sqlalchemy.orm import relationship
 
 from app.models.database import Base
@@ -18,5 +18,16 @@ class User(Base):
     favorites = relationship("Favorite", back_populates="user", cascade="all, delete-orphan")
     settings = relationship("UserSettings", back_populates="user", uselist=False, cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # アクティブユーザーのみの部分インデックス（配信対象の取得用）
+        Index(
+            "ix_users_active",
+            "id",
+            "line_user_id",
+            postgresql_where=text("is_active = true"),
+            sqlite_where=text("is_active = 1"),
+        ),
+    )
+
     def __repr__(self):
         return f"<User(id={self.id}, line_user_id={self.line_user_id})>"
@@ -1,11 +1,13 @@
 import json
 from datetime import datetime
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
 
-from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from app.models.database import Base
+from app.utils import json_codec
 
 
 # デフォルトカテゴリ（全選択）
@@ -19,6 +21,9 @@ CATEGORY_LABELS = {
     "infrastructure": "AIインフラ/チップ",
 }
 
+# カテゴリのビット位置（インメモリインデックス用のビットマスク表現）
+CATEGORY_BITS = {category: 1 << i for i, category in enumerate(DEFAULT_CATEGORIES)}
+
 # 言語設定の表示名
 LANGUAGE_LABELS = {
     "ja": "日本語のみ",
@@ -27,6 +32,28 @@ LANGUAGE_LABELS = {
 }
 
 
+def categories_to_mask(categories: List[str]) -> int:
+    """カテゴリリストをビットマスクに変換（未知のカテゴリは無視）"""
+    mask = 0
+    for category in categories:
+        mask |= CATEGORY_BITS.get(category, 0)
+    return mask
+
+
+def mask_to_categories(mask: int) -> List[str]:
+    """ビットマスクをカテゴリリストに変換"""
+    return [category for category, bit in CATEGORY_BITS.items() if mask & bit]
+
+
+@lru_cache(maxsize=256)
+def _parse_categories(raw: str) -> Tuple[str, ...]:
+    """categories列のJSONをデコード（組み合わせの種類は少ないため結果をキャッシュ）"""
+    try:
+        return tuple(json_codec.loads(raw))
+    except json_codec.JSONDecodeError:
+        return tuple(DEFAULT_CATEGORIES)
+
+
 class UserSettings(Base):
     __tablename__ = "user_settings"
 
@@ -47,19 +74,23 @@ class UserSettings(Base):
     # リレーション
     user = relationship("User", back_populates="settings")
 
+    __table_args__ = (
+        # 配信時間ごとのユーザー取得用
+        Index("ix_user_settings_delivery_hour_user", "delivery_hour", "user_id"),
+    )
+
     def __repr__(self):
         return f"<UserSettings(user_id={self.user_id}, hour={self.delivery_hour})>"
 
     def get_categories(self) -> List[str]:
         """カテゴリリストを取得"""
-        try:
-            return json.loads(self.categories) if self.categories else DEFAULT_CATEGORIES
-        except json.JSONDecodeError:
-            return DEFAULT_CATEGORIES
+        if not self.categories:
+            return list(DEFAULT_CATEGORIES)
+        return list(_parse_categories(self.categories))
 
     def set_categories(self, categories: List[str]) -> None:
         """カテゴリリストを設定"""
-        self.categories = json.dumps(categories)
+        self.categories = json_codec.dumps(categories)
 
     def toggle_category(self, category: str) -> bool:
         """カテゴリのON/OFFを切り替え。戻り値は切り替え後の状態"""
@@ -73,6 +104,10 @@ class UserSettings(Base):
         self.set_categories(current)
         return result
 
+    def get_category_mask(self) -> int:
+        """カテゴリをビットマスクで取得"""
+        return categories_to_mask(self.get_categories())
+
     def get_language_label(self) -> str:
         """言語設定の表示名を取得"""
         return LANGUAGE_LABELS.get(self.language, "両方")
@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime
+
+from app.models.database import Base
+
+
+class WebhookEvent(Base):
+    """処理済みwebhookイベントID（再送の重複排除用。保持期間ジョブでTTL切れを削除）"""
+
+    __tablename__ = "webhook_events"
+
+    event_id = Column(String(64), primary_key=True)
+    received_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<WebhookEvent(event_id={self.event_id})>"
@@ -0,0 +1,188 @@
+"""ソース横断の重複記事統合
+
+同じニュースが別URL（トラッキングパラメータ付き、AMP版、転載）で複数ソースに
+出てくるため、以下のいずれかで同一記事とみなしてクラスタにまとめる:
+  - 正規化URL（utm_* 等のトラッキングパラメータ・AMP・フラグメントを除去）が一致
+  - フィードが示す正規URL（rel=canonical / feedburner:origLink）が一致
+  - タイトル特徴量（英単語 / 日本語文字bigram）のJaccard係数が TITLE_SIMILARITY_THRESHOLD 以上
+    （MinHash LSHで比較候補を絞るため、記事数が増えても総当たりにならない）
+
+クラスタごとに代表記事を1件残し、掲載ソース数を source_count に設定する。
+"""
+import re
+import hashlib
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from app.services.article_record import ArticleRecord
+
+# 除去するトラッキング用クエリパラメータ
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "ref", "ref_src", "ref_url", "cmpid", "ncid", "sr_share", "guccounter",
+    "amp", "outputtype",
+}
+TRACKING_PREFIXES = ("utm_", "__twitter", "_hs")
+
+MINHASH_PERMUTATIONS = 32
+# 16バンド x 2行のLSHで候補を絞り、特徴量集合のJaccard係数で確定する
+MINHASH_BANDS = 16
+TITLE_SIMILARITY_THRESHOLD = 0.7
+# 特徴量がこれより少ない短いタイトルは誤判定が多いため比較しない
+MIN_TITLE_FEATURES = 4
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    (
+        int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE_PRIME | 1,
+        int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE_PRIME,
+    )
+    for i in range(MINHASH_PERMUTATIONS)
+]
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_CJK_RE = re.compile(r"[\u3040-\u309F\u30A0-\u30FF\u4E00-\u9FFF]+")
+
+# 記事URL -> フィードで判明した正規URL（収集サイクルをまたいで保持）
+_canonical_cache: Dict[str, str] = {}
+CANONICAL_CACHE_SIZE = 10_000
+
+
+def canonical_url(url: str) -> str:
+    """重複判定用にURLを正規化（トラッキングパラメータ/AMP/フラグメントを除去）"""
+    cached = _canonical_cache.get(url)
+    if cached:
+        url = cached
+
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if host.startswith("amp."):
+        host = host[4:]
+
+    # パスは大文字小文字を区別する（短縮URLやCMSのIDが別記事になるため）
+    path = parts.path
+    # AMP版のパス（/amp, /amp/, /amp.html, /article.amp）
+    path = re.sub(r"/amp(/|\.html)?$", "", path, flags=re.IGNORECASE)
+    path = re.sub(r"\.amp$", "", path, flags=re.IGNORECASE)
+    if path[:5].lower() == "/amp/":
+        path = path[4:]
+    path = path.rstrip("/")
+
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+
+    return urlunsplit(("", host, path, urlencode(query), ""))
+
+
+def remember_canonical(url: str, canonical: Optional[str]) -> None:
+    """フィードから判明した正規URLをキャッシュ"""
+    if not canonical or canonical == url:
+        return
+    if len(_canonical_cache) >= CANONICAL_CACHE_SIZE:
+        # 古いものから捨てる（dictは挿入順）
+        del _canonical_cache[next(iter(_canonical_cache))]
+    _canonical_cache[url] = canonical
+
+
+def _title_features(title: str) -> List[str]:
+    """英数字は単語、日本語は文字bigramを特徴量とする"""
+    text = title.lower()
+    features = _WORD_RE.findall(text)
+    for run in _CJK_RE.findall(text):
+        if len(run) == 1:
+            features.append(run)
+        features.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return features
+
+
+def title_minhash(features: Set[str]) -> Tuple[int, ...]:
+    """タイトル特徴量集合のMinHashシグネチャ"""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for feature in features
+    ]
+    return tuple(
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def _minhash_bands(signature: Tuple[int, ...]):
+    rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+    for band in range(MINHASH_BANDS):
+        yield band, signature[band * rows:(band + 1) * rows]
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b)
+
+
+def dedupe_articles(articles: List[ArticleRecord]) -> List[ArticleRecord]:
+    """重複記事をクラスタにまとめ、代表記事（先に収集したもの）に source_count を設定して返す"""
+    parent = list(range(len(articles)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(a: int, b: int) -> None:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            # 先に収集した記事を代表にする
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    url_owner: Dict[str, int] = {}
+    band_members: Dict[tuple, List[int]] = {}
+    title_features: List[Set[str]] = []
+
+    for i, article in enumerate(articles):
+        remember_canonical(article.url, article.canonical_url)
+        keys = {canonical_url(article.url)}
+        if article.canonical_url:
+            keys.add(canonical_url(article.canonical_url))
+        for key in keys:
+            if key in url_owner:
+                union(i, url_owner[key])
+            else:
+                url_owner[key] = i
+
+        features = set(_title_features(article.title))
+        title_features.append(features)
+        if len(features) < MIN_TITLE_FEATURES:
+            continue
+        candidates = set()
+        for band in _minhash_bands(title_minhash(features)):
+            members = band_members.setdefault(band, [])
+            candidates.update(members)
+            members.append(i)
+        for j in candidates:
+            if _jaccard(features, title_features[j]) >= TITLE_SIMILARITY_THRESHOLD:
+                union(i, j)
+
+    # 代表記事は各クラスタの最小インデックスなので、収集順が保たれる
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(articles)):
+        clusters.setdefault(find(i), []).append(i)
+
+    results = []
+    for root, members in clusters.items():
+        representative = articles[root]
+        for i in members[1:]:
+            # 代表記事に欠けている情報は他のソースから補う
+            other = articles[i]
+            if not representative.summary and other.summary:
+                representative.summary = other.summary
+            if not representative.thumbnail_url and other.thumbnail_url:
+                representative.thumbnail_url = other.thumbnail_url
+        representative.source_count = len({articles[i].source for i in members})
+        results.append(representative)
+
+    return results
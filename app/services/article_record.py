@@ -0,0 +1,91 @@
+"""パイプライン内の記事レコード
+
+収集 → 重複統合 → スコアリング → ランキング → 保存・配信までを1つのオブジェクトで運ぶ。
+各段階は新しいオブジェクトを作らずにフィールドを書き込むため、記事ごとのコピーが残らない。
+__slots__ でインスタンスごとの __dict__ を持たないため、1件あたりのメモリも小さい。
+
+カテゴリのビットマスクと言語は最初に必要になった時点で1回だけ判定して保持する
+（RankingEngine を何度作っても判定し直さない）。
+"""
+import sys
+from datetime import datetime
+from typing import Iterable, Optional
+
+
+class ArticleRecord:
+    __slots__ = (
+        # 収集
+        "url",
+        "title",
+        "summary",
+        "source",
+        "thumbnail_url",
+        "published_at",
+        "canonical_url",  # フィードが示す正規URL
+        "source_count",  # 重複統合後の掲載ソース数
+        # スコアリング
+        "hatena_count",
+        "hackernews_score",
+        "reddit_score",
+        "popularity_score",  # RankingEngine.apply_popularity_scores で設定
+        "social_stale",  # ソーシャル指標が今回取得できず、前回の値（または0）で代用している
+        # ランキング用の判定結果（None は未判定）
+        "category_mask",
+        "language",
+    )
+
+    def __init__(
+        self,
+        url: str,
+        title: str,
+        summary: str,
+        source: str,
+        thumbnail_url: Optional[str] = None,
+        published_at: Optional[datetime] = None,
+        canonical_url: Optional[str] = None,
+        source_count: int = 1,
+        hatena_count: int = 0,
+        hackernews_score: int = 0,
+        reddit_score: int = 0,
+        popularity_score: int = 0,
+        social_stale: bool = False,
+        category_mask: Optional[int] = None,
+        language: Optional[str] = None,
+    ):
+        self.url = url
+        self.title = title
+        self.summary = summary
+        self.source = source
+        self.thumbnail_url = thumbnail_url
+        self.published_at = published_at
+        self.canonical_url = canonical_url
+        self.source_count = source_count
+        self.hatena_count = hatena_count
+        self.hackernews_score = hackernews_score
+        self.reddit_score = reddit_score
+        self.popularity_score = popularity_score
+        self.social_stale = social_stale
+        self.category_mask = category_mask
+        self.language = language
+
+    def __repr__(self) -> str:
+        return f"<ArticleRecord(source={self.source!r}, url={self.url!r}, popularity={self.popularity_score})>"
+
+    def __getstate__(self):
+        # プロセスプールとの受け渡し（pickle）用
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state) -> None:
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+
+def records_nbytes(articles: Iterable[ArticleRecord]) -> int:
+    """記事レコードとその文字列フィールドが使うメモリ（バイト）の概算"""
+    total = 0
+    for article in articles:
+        total += sys.getsizeof(article)
+        for value in (article.url, article.title, article.summary, article.thumbnail_url, article.canonical_url):
+            if value:
+                total += sys.getsizeof(value)
+    return total
@@ -0,0 +1,119 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
+
+from sqlalchemy import and_, delete, exists, func, or_, select
+
+from app.config import settings
+from app.models import Article, ArticleSocialSample, Favorite, async_session
+from app.utils.metrics import ARTICLES_PURGED, SOCIAL_SAMPLES
+
+
+async def _delete_in_batches(model, id_query, batch_size: int, where_clause: Sequence = ()) -> int:
+    """id_query（LIMIT batch_size 付き）で選んだ行を、無くなるまでバッチ単位で削除
+
+    where_clause は DELETE 文にも付ける条件。選んでから削除するまでの間に条件を
+    満たさなくなった行（その間にお気に入りされた記事など）は削除しない。
+
+    Returns:
+        int: 削除した行数
+    """
+    total = 0
+    while True:
+        async with async_session() as session:
+            ids = list((await session.execute(id_query)).scalars().all())
+            if not ids:
+                break
+
+            result = await session.execute(delete(model).where(model.id.in_(ids)).where(*where_clause))
+            await session.commit()
+
+        total += result.rowcount
+        if len(ids) < batch_size:
+            break
+        # バッチ間で他の処理（webhook等）に譲る
+        await asyncio.sleep(0)
+
+    return total
+
+
+async def purge_old_articles(
+    max_age_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> int:
+    """保持期間を過ぎ、誰もお気に入りしていない記事を削除
+
+    長時間のロックを避けるため batch_size 件ずつ削除してコミットする。
+    公開日時のない記事は取得日時で判定する。
+
+    Returns:
+        int: 削除した記事数
+    """
+    max_age_days = max_age_days or settings.article_retention_days
+    batch_size = batch_size or settings.article_retention_batch_size
+    cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+
+    conditions = (
+        or_(
+            Article.published_at < cutoff,
+            and_(Article.published_at.is_(None), Article.fetched_at < cutoff),
+        ),
+        ~exists().where(Favorite.article_id == Article.id),
+    )
+    expired = select(Article.id).where(*conditions).limit(batch_size)
+
+    total = await _delete_in_batches(Article, expired, batch_size, where_clause=conditions)
+    ARTICLES_PURGED.inc(total)
+
+    print(f"[purge_old_articles] Reclaimed {total} articles older than {max_age_days} days")
+    return total
+
+
+async def downsample_social_samples(
+    raw_hours: Optional[int] = None,
+    max_age_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> int:
+    """ソーシャル指標の時系列を間引く
+
+    raw_hours より古いサンプルは記事ごと・日ごとに最新の1点だけ残し、
+    記事の保持期間を過ぎたサンプルは削除する。
+
+    Returns:
+        int: 削除したサンプル数
+    """
+    raw_hours = raw_hours or settings.social_sample_raw_hours
+    max_age_days = max_age_days or settings.article_retention_days
+    batch_size = batch_size or settings.article_retention_batch_size
+    now = datetime.utcnow()
+    raw_cutoff = now - timedelta(hours=raw_hours)
+    expire_cutoff = now - timedelta(days=max_age_days)
+
+    expired = (
+        select(ArticleSocialSample.id)
+        .where(ArticleSocialSample.ts < expire_cutoff)
+        .limit(batch_size)
+    )
+    expired_count = await _delete_in_batches(ArticleSocialSample, expired, batch_size)
+    SOCIAL_SAMPLES.inc(expired_count, op="expired")
+
+    # 追記のみのテーブルなので、同じ記事・同じ日の中ではidが最大のものが最新
+    daily_latest = (
+        select(func.max(ArticleSocialSample.id))
+        .where(ArticleSocialSample.ts < raw_cutoff)
+        .group_by(ArticleSocialSample.article_id, func.date(ArticleSocialSample.ts))
+    )
+    redundant = (
+        select(ArticleSocialSample.id)
+        .where(ArticleSocialSample.ts < raw_cutoff)
+        .where(ArticleSocialSample.id.not_in(daily_latest))
+        .limit(batch_size)
+    )
+    downsampled_count = await _delete_in_batches(ArticleSocialSample, redundant, batch_size)
+    SOCIAL_SAMPLES.inc(downsampled_count, op="downsampled")
+
+    print(
+        f"[downsample_social_samples] Removed {expired_count} expired and "
+        f"{downsampled_count} downsampled samples"
+    )
+    return expired_count + downsampled_count
@@ -0,0 +1,229 @@
+"""ユーザーごとの配信履歴（配信済み記事を再送しないため）
+
+各ユーザーについて、配信した記事の article_id を2世代のBloomフィルタに記録する。
+  - 判定は k 個のビットを見るだけなので、候補記事1件あたり O(1)
+  - 1ユーザーあたり DELIVERY_HISTORY_BITS / 8 バイト × 2世代（既定 256B × 2）
+  - 現世代が DELIVERY_HISTORY_DAYS を過ぎるか容量に達したら前世代と入れ替える
+    （配信から DELIVERY_HISTORY_DAYS〜その2倍の期間で忘れる）
+
+Bloomフィルタなので未配信の記事を配信済みと誤判定することがある（容量内で約1%）。
+その場合は1件下位の記事で補充されるだけで、配信済みの記事を再送することはない。
+
+保存時は読み込み後に記録した記事だけを、保存済みの最新の履歴に追加する（行ロック下）。
+同じユーザーの「今日のニュース」と毎時配信が同時に保存しても、互いの記録を消さない。
+
+    histories = await load_histories(line_user_ids)
+    top = await get_top_articles(count, categories, language, seen=histories[line_user_id])
+    histories[line_user_id].add_articles(top)
+    await save_histories(histories)
+"""
+import math
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, select
+
+from app.config import settings
+from app.models import DeliveryHistory, async_session
+from app.utils.flex_message import _generate_article_id
+
+# 1記事あたりに立てるビット数
+HASH_COUNT = 7
+
+# 誤判定率が約1%を超えないよう、1世代に記録する記事数の上限を決める
+TARGET_FALSE_POSITIVE_RATE = 0.01
+
+
+def _capacity(bits: int) -> int:
+    return max(1, int(bits * math.log(2) ** 2 / -math.log(TARGET_FALSE_POSITIVE_RATE)))
+
+
+class DeliveryBloomFilter:
+    """1ユーザー分の配信履歴（現世代 + 前世代のBloomフィルタ）"""
+
+    def __init__(
+        self,
+        bits: int,
+        current: Optional[bytearray] = None,
+        previous: Optional[bytearray] = None,
+        current_count: int = 0,
+        rotated_at: Optional[datetime] = None,
+    ):
+        self.bits = bits
+        self.current = current if current is not None else bytearray(bits // 8)
+        self.previous = previous
+        self.current_count = current_count
+        self.rotated_at = rotated_at or datetime.utcnow()
+        self.dirty = False
+        # 読み込み（前回の保存）以降に記録した article_id（保存時に保存済みの履歴へ追加する）
+        self.pending: List[str] = []
+
+    def _positions(self, article_id: str) -> List[int]:
+        # article_id（MD5の先頭64bit）を2つの32bitに分けてダブルハッシュ
+        value = int(article_id, 16)
+        h1 = value & 0xFFFFFFFF
+        h2 = (value >> 32) | 1
+        return [(h1 + i * h2) % self.bits for i in range(HASH_COUNT)]
+
+    @staticmethod
+    def _test(bitmap: Optional[bytearray], positions: List[int]) -> bool:
+        if bitmap is None:
+            return False
+        return all(bitmap[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def __contains__(self, article_id: str) -> bool:
+        positions = self._positions(article_id)
+        return self._test(self.current, positions) or self._test(self.previous, positions)
+
+    def add(self, article_id: str) -> None:
+        positions = self._positions(article_id)
+        if self._test(self.current, positions):
+            return
+        self.pending.append(article_id)
+        if self.current_count >= _capacity(self.bits):
+            self.rotate()
+        for p in positions:
+            self.current[p >> 3] |= 1 << (p & 7)
+        self.current_count += 1
+        self.dirty = True
+
+    def add_articles(self, articles: Iterable) -> None:
+        """配信した記事を記録"""
+        for article in articles:
+            self.add(_generate_article_id(article.url))
+
+    def rotate(self, now: Optional[datetime] = None) -> None:
+        """現世代を前世代にして、空の現世代を作る"""
+        self.previous = self.current
+        self.current = bytearray(self.bits // 8)
+        self.current_count = 0
+        self.rotated_at = now or datetime.utcnow()
+        self.dirty = True
+
+    def expire(self, now: Optional[datetime] = None) -> None:
+        """期間を過ぎた世代を捨てる"""
+        now = now or datetime.utcnow()
+        window = timedelta(days=settings.delivery_history_days)
+        age = now - self.rotated_at
+        if age >= window * 2:
+            # 2世代とも期間切れ
+            self.previous = None
+            self.current = bytearray(self.bits // 8)
+            self.current_count = 0
+            self.rotated_at = now
+            self.dirty = True
+        elif age >= window:
+            self.rotate(now)
+
+    def merge_into(self, stored: "DeliveryBloomFilter", now: Optional[datetime] = None) -> None:
+        """保存済みの最新の履歴に、この履歴で記録した記事を追加して自身をその状態にする"""
+        stored.expire(now)
+        for article_id in self.pending:
+            stored.add(article_id)
+        self.current = stored.current
+        self.previous = stored.previous
+        self.current_count = stored.current_count
+        self.rotated_at = stored.rotated_at
+
+    @classmethod
+    def from_row(cls, row: DeliveryHistory, bits: int) -> "DeliveryBloomFilter":
+        if len(row.current_bits) * 8 != bits:
+            # ビット数の設定が変わった履歴は使えないため作り直す
+            return cls(bits)
+        previous = bytearray(row.previous_bits) if row.previous_bits and len(row.previous_bits) * 8 == bits else None
+        return cls(bits, bytearray(row.current_bits), previous, row.current_count, row.rotated_at)
+
+
+async def load_histories(line_user_ids: List[str]) -> Dict[str, DeliveryBloomFilter]:
+    """ユーザーの配信履歴をまとめて読み込む（履歴がないユーザーは空のフィルタ）"""
+    bits = settings.delivery_history_bits
+    histories = {line_user_id: DeliveryBloomFilter(bits) for line_user_id in line_user_ids}
+    if not histories:
+        return histories
+
+    try:
+        async with async_session() as session:
+            result = await session.execute(
+                select(DeliveryHistory).where(DeliveryHistory.line_user_id.in_(list(histories)))
+            )
+            for row in result.scalars():
+                histories[row.line_user_id] = DeliveryBloomFilter.from_row(row, bits)
+    except Exception as e:
+        print(f"[load_histories] ERROR: {e}")
+
+    now = datetime.utcnow()
+    for history in histories.values():
+        history.expire(now)
+    return histories
+
+
+async def save_histories(histories: Dict[str, DeliveryBloomFilter]) -> int:
+    """変更のあった配信履歴を保存
+
+    Returns:
+        int: 保存したユーザー数
+    """
+    from sqlalchemy.exc import IntegrityError, OperationalError
+
+    dirty = {line_user_id: h for line_user_id, h in histories.items() if h.dirty}
+    if not dirty:
+        return 0
+
+    bits = settings.delivery_history_bits
+    for attempt in range(2):
+        try:
+            async with async_session() as session:
+                # 同じユーザーの履歴を同時に保存する処理とは行ロックで順番に追加する
+                result = await session.execute(
+                    select(DeliveryHistory)
+                    .where(DeliveryHistory.line_user_id.in_(list(dirty)))
+                    .with_for_update()
+                )
+                rows = {row.line_user_id: row for row in result.scalars()}
+                now = datetime.utcnow()
+                for line_user_id, history in dirty.items():
+                    row = rows.get(line_user_id)
+                    if row is None:
+                        row = DeliveryHistory(line_user_id=line_user_id)
+                        session.add(row)
+                    else:
+                        history.merge_into(DeliveryBloomFilter.from_row(row, bits), now)
+                    row.current_bits = bytes(history.current)
+                    row.previous_bits = bytes(history.previous) if history.previous is not None else None
+                    row.current_count = history.current_count
+                    row.rotated_at = history.rotated_at
+                await session.commit()
+            break
+
+        except (IntegrityError, OperationalError) as e:
+            # 初回保存の同時INSERT・SQLiteの書き込み競合は、保存済みの履歴への追加として1回だけやり直す
+            if attempt:
+                print(f"[save_histories] ERROR: {e}")
+                return 0
+            print("[save_histories] Conflict with a concurrent save, retrying as merge")
+
+        except Exception as e:
+            print(f"[save_histories] ERROR: {e}")
+            return 0
+
+    for history in dirty.values():
+        history.dirty = False
+        history.pending.clear()
+    return len(dirty)
+
+
+async def purge_stale_histories(max_age_days: Optional[int] = None) -> int:
+    """2世代とも期間切れになった（しばらく配信していない）ユーザーの履歴を削除
+
+    Returns:
+        int: 削除した件数
+    """
+    max_age_days = max_age_days or settings.delivery_history_days * 2
+    cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+
+    async with async_session() as session:
+        result = await session.execute(delete(DeliveryHistory).where(DeliveryHistory.updated_at < cutoff))
+        await session.commit()
+
+    print(f"[purge_stale_histories] Removed {result.rowcount} delivery histories")
+    return result.rowcount
@@ -0,0 +1,105 @@
+"""webhookイベントの重複排除（webhookEventId単位）
+
+LINEは応答が遅い・失敗したwebhookを再送するため、同じイベントを2回処理しないように
+webhookEventIdを記録し、既に受け付けたイベントはDB処理や外部API呼び出しの前に破棄する。
+  - memory : プロセス内のLRU（WEBHOOK_DEDUP_LRU_SIZE件、WEBHOOK_DEDUP_TTL_SECONDS秒）
+  - db     : LRUに加えて webhook_events テーブルに主キーとしてINSERTする。
+             複数ワーカーのどれに再送が届いても重複を検出できる
+
+処理に失敗したイベントは記録を取り消し、LINEの再送で処理し直せるようにする。
+"""
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.models import WebhookEvent, async_session
+from app.utils.metrics import WEBHOOK_DUPLICATE_EVENTS
+
+
+class EventDeduplicator:
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # event_id -> 受け付けた時刻（monotonic）。古い順に並ぶ
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+
+    def _seen_recently(self, event_id: str, now: float) -> bool:
+        received = self._seen.get(event_id)
+        if received is None:
+            return False
+        if now - received > self.ttl_seconds:
+            del self._seen[event_id]
+            return False
+        return True
+
+    def _remember(self, event_id: str, now: float) -> None:
+        self._seen[event_id] = now
+        self._seen.move_to_end(event_id)
+        while len(self._seen) > self.max_size:
+            self._seen.popitem(last=False)
+
+    async def claim(self, event_id: Optional[str]) -> bool:
+        """イベントを処理してよければTrue（初めて受け付けた）、重複ならFalse"""
+        if not event_id:
+            return True
+
+        now = time.monotonic()
+        if self._seen_recently(event_id, now):
+            WEBHOOK_DUPLICATE_EVENTS.inc(layer="memory")
+            return False
+
+        if settings.webhook_dedup_backend == "db":
+            try:
+                async with async_session() as session:
+                    session.add(WebhookEvent(event_id=event_id, received_at=datetime.utcnow()))
+                    await session.commit()
+            except IntegrityError:
+                # 別のワーカー（または再起動前のプロセス）が受け付け済み
+                self._remember(event_id, now)
+                WEBHOOK_DUPLICATE_EVENTS.inc(layer="db")
+                return False
+
+        self._remember(event_id, now)
+        return True
+
+    async def release(self, event_id: Optional[str]) -> None:
+        """処理に失敗したイベントの記録を取り消す（再送で処理し直せるように）"""
+        if not event_id:
+            return
+
+        self._seen.pop(event_id, None)
+        if settings.webhook_dedup_backend == "db":
+            try:
+                async with async_session() as session:
+                    await session.execute(delete(WebhookEvent).where(WebhookEvent.event_id == event_id))
+                    await session.commit()
+            except Exception as e:
+                print(f"[EventDeduplicator] release error: {e}")
+
+
+async def purge_expired_webhook_events(ttl_seconds: Optional[float] = None) -> int:
+    """TTLを過ぎた webhook_events を削除
+
+    Returns:
+        int: 削除した件数
+    """
+    ttl_seconds = ttl_seconds or settings.webhook_dedup_ttl_seconds
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+
+    async with async_session() as session:
+        result = await session.execute(delete(WebhookEvent).where(WebhookEvent.received_at < cutoff))
+        await session.commit()
+
+    print(f"[purge_expired_webhook_events] Removed {result.rowcount} expired events")
+    return result.rowcount
+
+
+event_deduplicator = EventDeduplicator(
+    max_size=settings.webhook_dedup_lru_size,
+    ttl_seconds=settings.webhook_dedup_ttl_seconds,
+)
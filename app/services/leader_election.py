@@ -0,0 +1,233 @@
+"""スケジューラーのリーダー選出（複数ワーカー構成で配信ジョブを1プロセスだけが実行する）
+
+各プロセスが一定間隔（リース期間の1/3）でリーダー権の取得・更新を試み、
+リーダーになったプロセスだけがスケジューラーを起動する。
+  - PostgreSQL : セッションレベルのアドバイザリロック（pg_try_advisory_lock）を
+                 専用コネクションで保持する。プロセスやコネクションが落ちるとロックが
+                 解放されるため、他のプロセスが次の試行で引き継ぐ
+  - その他     : scheduler_leases テーブルのリース行をハートビートで延長する。
+                 更新が途絶えてリース期限（SCHEDULER_LEASE_SECONDS）を過ぎると引き継がれる
+                 （リース方式はホスト間の時刻ずれがリース期間より十分小さいことが前提）
+
+リーダー権を失ったと確認できたプロセス（リース期限切れ・ロックを保持するコネクションの切断）は
+スケジューラーを停止する。ハートビートの一時的なエラーでは、リース期限内ならリーダーのまま。
+
+claim_run() はリース行に最後に実行した枠を記録し、同じ枠のジョブを1回だけ実行させる
+（新しいリーダーが取りこぼした枠を実行する場合も、前のリーダーと二重に実行しない）。
+"""
+import os
+import time
+import uuid
+import socket
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import or_, select, text, update
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.models import SchedulerLease, async_session, get_engine
+from app.utils.metrics import SCHEDULER_LEADER
+
+
+def _advisory_lock_key(name: str) -> int:
+    """ロック名から pg_advisory_lock 用の64bit符号付き整数を生成"""
+    digest = hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class LeaderElection:
+    def __init__(self, name: str, on_elected: Callable[[], None], on_demoted: Callable[[], None]):
+        self.name = name
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+        self._conn = None  # PostgreSQL: アドバイザリロックを保持するコネクション
+        self._lease_valid_until = 0.0  # リース方式: 最後に更新できたリースの期限（monotonic）
+
+    @property
+    def lease_seconds(self) -> int:
+        return settings.scheduler_lease_seconds
+
+    def start(self) -> None:
+        """リーダー選出ループを開始"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """選出ループを止め、リーダー権を返す（他のプロセスがすぐ引き継げるように）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self.is_leader:
+            self._set_leader(False)
+        try:
+            await self._release()
+        except Exception as e:
+            print(f"[LeaderElection] release error ({self.name}): {e}")
+
+    async def _run(self) -> None:
+        interval = max(1.0, self.lease_seconds / 3)
+        while True:
+            started = time.monotonic()
+            try:
+                acquired = await self._try_acquire()
+                if acquired:
+                    self._lease_valid_until = started + self.lease_seconds
+            except Exception as e:
+                print(f"[LeaderElection] heartbeat error ({self.name}): {e}")
+                # 一時的なエラー（SQLiteのロック待ち等）では、リーダー権を失ったと確認できるまで降格しない
+                acquired = self.is_leader and self._still_holds()
+
+            if acquired != self.is_leader:
+                self._set_leader(acquired)
+            await asyncio.sleep(interval)
+
+    def _set_leader(self, leader: bool) -> None:
+        self.is_leader = leader
+        SCHEDULER_LEADER.set(1 if leader else 0)
+        if leader:
+            print(f"[LeaderElection] {self.holder_id} became leader of {self.name}")
+            self.on_elected()
+        else:
+            print(f"[LeaderElection] {self.holder_id} lost leadership of {self.name}")
+            self.on_demoted()
+
+    def _still_holds(self) -> bool:
+        """ハートビートに失敗した時点でリーダー権がまだ有効か"""
+        if self._uses_advisory_lock():
+            # ロックを保持するコネクションが切断（破棄）されていればロックも解放されている
+            return self._conn is not None
+        return time.monotonic() < self._lease_valid_until
+
+    def _uses_advisory_lock(self) -> bool:
+        return get_engine().dialect.name == "postgresql"
+
+    async def _try_acquire(self) -> bool:
+        """リーダー権を取得または更新（取得できていればTrue）"""
+        if self._uses_advisory_lock():
+            return await self._try_advisory_lock()
+        return await self._try_lease()
+
+    async def _try_advisory_lock(self) -> bool:
+        if self._conn is not None:
+            # 保持中: コネクションが生きていればロックも保持されている
+            try:
+                await self._conn.execute(text("SELECT 1"))
+                await self._conn.commit()
+                return True
+            except Exception:
+                await self._discard_connection()
+                raise
+
+        conn = await get_engine().connect()
+        try:
+            acquired = (await conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"),
+                {"key": _advisory_lock_key(self.name)},
+            )).scalar()
+            # セッションレベルのロックはトランザクション終了後も保持される
+            await conn.commit()
+        except Exception:
+            await conn.close()
+            raise
+
+        if acquired:
+            self._conn = conn
+            return True
+        await conn.close()
+        return False
+
+    async def _discard_connection(self) -> None:
+        conn, self._conn = self._conn, None
+        try:
+            await conn.invalidate()
+        except Exception:
+            pass
+
+    async def _try_lease(self) -> bool:
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+
+        async with async_session() as session:
+            result = await session.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == self.name)
+                .where(or_(SchedulerLease.holder == self.holder_id, SchedulerLease.expires_at < now))
+                .values(holder=self.holder_id, expires_at=expires_at, updated_at=now)
+            )
+            if result.rowcount:
+                await session.commit()
+                return True
+
+            existing = await session.scalar(select(SchedulerLease.name).where(SchedulerLease.name == self.name))
+            if existing is not None:
+                return False
+
+            session.add(SchedulerLease(name=self.name, holder=self.holder_id, expires_at=expires_at, updated_at=now))
+            try:
+                await session.commit()
+            except IntegrityError:
+                # 他のプロセスが同時に作成した
+                return False
+            return True
+
+    async def claim_run(self, slot: str) -> bool:
+        """slot（実行する枠）を実行済みとして記録（既に記録されていればFalse）"""
+        async with async_session() as session:
+            result = await session.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == self.name)
+                .where(or_(SchedulerLease.last_run_slot.is_(None), SchedulerLease.last_run_slot != slot))
+                .values(last_run_slot=slot)
+            )
+            if result.rowcount:
+                await session.commit()
+                return True
+
+            existing = await session.scalar(select(SchedulerLease.name).where(SchedulerLease.name == self.name))
+            if existing is not None:
+                return False
+
+            # アドバイザリロック方式ではリース行がないため、記録用に作成する
+            now = datetime.utcnow()
+            session.add(SchedulerLease(
+                name=self.name, holder=self.holder_id, expires_at=now, updated_at=now, last_run_slot=slot,
+            ))
+            try:
+                await session.commit()
+            except IntegrityError:
+                # 他のプロセスが同時に作成した
+                return False
+            return True
+
+    async def _release(self) -> None:
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            try:
+                await conn.execute(
+                    text("SELECT pg_advisory_unlock(:key)"),
+                    {"key": _advisory_lock_key(self.name)},
+                )
+                await conn.commit()
+            finally:
+                await conn.close()
+            return
+
+        if not self._uses_advisory_lock():
+            async with async_session() as session:
+                await session.execute(
+                    update(SchedulerLease)
+                    .where(SchedulerLease.name == self.name, SchedulerLease.holder == self.holder_id)
+                    .values(expires_at=datetime.utcnow())
+                )
+                await session.commit()
@@ -1,74 +1,223 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple, TYPE_CHECKING
+import time
 import uuid
 
-from linebot.v3 import WebhookHandler
-from linebot.v3.messaging import (
-    AsyncApiClient,
-    AsyncMessagingApi,
-    Configuration,
-    TextMessage,
-    FlexMessage,
-    FlexContainer,
-    PushMessageRequest,
-    BroadcastRequest,
-)
-from sqlalchemy import select
+from sqlalchemy import or_, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.models import User, Article, Favorite, UserSettings, async_session
+from app.services.recipient_index import recipient_index
+from app.utils.metrics import (
+    LINE_REPLY_FALLBACKS,
+    OUTBOUND_REQUESTS,
+    OUTBOUND_REQUEST_SECONDS,
+    PIPELINE_STAGE_SECONDS,
+)
+from app.utils.tracing import span
+
+# linebot.v3.messaging はimportに1秒以上かかるため、最初の送信時に読み込む
+if TYPE_CHECKING:
+    from linebot.v3.messaging import AsyncMessagingApi
+
+LINE_API_HOST = "api.line.me"
+
+# reply_message / push_message 1回で送れるメッセージ数の上限
+MAX_MESSAGES_PER_REQUEST = 5
+
+# 送信系エンドポイント（SDKのpydanticモデルを経由せず、組み立てたdictをそのまま送る）
+MESSAGING_API_PATHS = {
+    "reply_message": "/v2/bot/message/reply",
+    "push_message": "/v2/bot/message/push",
+    "broadcast": "/v2/bot/message/broadcast",
+}
+
+_messaging_api: Optional["AsyncMessagingApi"] = None
+
+
+async def get_messaging_api() -> "AsyncMessagingApi":
+    """LINE Messaging API クライアント取得（初回呼び出し時に作成し、以降は接続ごと使い回す）"""
+    global _messaging_api
+    if _messaging_api is None:
+        from linebot.v3.messaging import AsyncApiClient, AsyncMessagingApi, Configuration
+
+        configuration = Configuration(access_token=settings.line_channel_access_token)
+        _messaging_api = AsyncMessagingApi(AsyncApiClient(configuration))
+    return _messaging_api
+
+
+async def close_messaging_api() -> None:
+    """LINE Messaging API クライアントの接続を閉じる"""
+    global _messaging_api
+    if _messaging_api is not None:
+        await _messaging_api.api_client.close()
+        _messaging_api = None
+
 
+def text_message(text: str) -> dict:
+    return {"type": "text", "text": text}
 
-configuration = Configuration(access_token=settings.line_channel_access_token)
-handler = WebhookHandler(settings.line_channel_secret)
 
+def flex_message(alt_text: str, flex_content: dict) -> dict:
+    return {"type": "flex", "altText": alt_text, "contents": flex_content}
 
-async def get_messaging_api() -> AsyncMessagingApi:
-    """LINE Messaging API クライアント取得"""
-    api_client = AsyncApiClient(configuration)
-    return AsyncMessagingApi(api_client)
+
+async def _post_messaging_api(api: "AsyncMessagingApi", method: str, payload: dict) -> None:
+    """送信ペイロード（dict）をSDKのリクエスト経路（ApiClient.call_api）でPOST
+
+    FlexContainer.from_dict によるモデル変換・再シリアライズ（1メッセージ数ms）を省く。
+    認証ヘッダー・タイムアウト・プロキシはSDKの設定どおり。エラー時は ApiException を送出する。
+    """
+    await api.api_client.call_api(
+        MESSAGING_API_PATHS[method],
+        "POST",
+        header_params={"Accept": "application/json", "Content-Type": "application/json"},
+        body=payload,
+        response_types_map={},
+        auth_settings=["Bearer"],
+        _host=api.line_base_path,
+    )
+
+
+async def _call_messaging_api(method: str, payload: dict) -> None:
+    """Messaging API呼び出し（reply/push/broadcast）のレイテンシとステータスを記録"""
+    from linebot.v3.messaging import ApiException
+
+    api = await get_messaging_api()
+    started = time.perf_counter()
+    status = "200"
+    try:
+        with span(f"line.{method}"):
+            await _post_messaging_api(api, method, payload)
+    except ApiException as e:
+        status = str(e.status)
+        raise
+    except Exception as e:
+        status = type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        PIPELINE_STAGE_SECONDS.observe(elapsed, stage="reply" if method == "reply_message" else "push")
+        OUTBOUND_REQUEST_SECONDS.observe(elapsed, host=LINE_API_HOST)
+        OUTBOUND_REQUESTS.inc(host=LINE_API_HOST, status=status)
 
 
 async def send_text_message(user_id: str, text: str) -> None:
     """テキストメッセージ送信"""
-    api = await get_messaging_api()
-    await api.push_message(
-        PushMessageRequest(
-            to=user_id,
-            messages=[TextMessage(text=text)]
-        )
+    await _call_messaging_api(
+        "push_message",
+        {"to": user_id, "messages": [text_message(text)]},
     )
 
 
 async def send_flex_message(user_id: str, alt_text: str, flex_content: dict) -> None:
     """Flex Message送信"""
-    api = await get_messaging_api()
-    await api.push_message(
-        PushMessageRequest(
-            to=user_id,
-            messages=[
-                FlexMessage(
-                    alt_text=alt_text,
-                    contents=FlexContainer.from_dict(flex_content)
-                )
-            ]
+    with span("send_flex_message", alt_text=alt_text):
+        await _call_messaging_api(
+            "push_message",
+            {"to": user_id, "messages": [flex_message(alt_text, flex_content)]},
         )
-    )
 
 
 async def broadcast_flex_message(alt_text: str, flex_content: dict) -> None:
     """全ユーザーにFlex Messageをブロードキャスト"""
-    api = await get_messaging_api()
-    await api.broadcast(
-        BroadcastRequest(
-            messages=[
-                FlexMessage(
-                    alt_text=alt_text,
-                    contents=FlexContainer.from_dict(flex_content)
+    await _call_messaging_api(
+        "broadcast",
+        {"messages": [flex_message(alt_text, flex_content)]},
+    )
+
+
+def _is_reply_token_error(e: Exception) -> bool:
+    body = getattr(e, "body", None) or ""
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", "replace")
+    return getattr(e, "status", None) == 400 and "reply token" in body.lower()
+
+
+class EventReply:
+    """webhookイベントへの応答メッセージをまとめて送る
+
+    ハンドラーは text() / flex() でメッセージを積み、最後に send() を呼ぶ。
+    イベントの replyToken で1回の reply_message（最大5件）にまとめて送信し、
+    トークンが期限切れ・使用済みの場合だけ push_message で送る。
+    """
+
+    def __init__(self, user_id: str, reply_token: Optional[str] = None, timestamp_ms: Optional[int] = None):
+        self.user_id = user_id
+        self.reply_token = reply_token
+        self.timestamp_ms = timestamp_ms
+        self.messages: list = []
+
+    @classmethod
+    def for_event(cls, event: dict, user_id: str) -> "EventReply":
+        return cls(user_id, event.get("replyToken"), event.get("timestamp"))
+
+    def text(self, text: str) -> None:
+        self.messages.append(text_message(text))
+
+    def flex(self, alt_text: str, flex_content: dict) -> None:
+        self.messages.append(flex_message(alt_text, flex_content))
+
+    def _token_expired(self) -> bool:
+        if not self.timestamp_ms:
+            return False
+        age = time.time() - self.timestamp_ms / 1000
+        return age > settings.line_reply_token_ttl_seconds
+
+    async def _reply(self, messages: list) -> bool:
+        """replyTokenで送信（送れなかった場合はFalse）"""
+        from linebot.v3.messaging import ApiException
+
+        if not self.reply_token:
+            return False
+        if self._token_expired():
+            LINE_REPLY_FALLBACKS.inc(reason="expired")
+            return False
+
+        reply_token, self.reply_token = self.reply_token, None  # replyTokenは1回しか使えない
+        try:
+            await _call_messaging_api(
+                "reply_message",
+                {"replyToken": reply_token, "messages": messages},
+            )
+        except ApiException as e:
+            # 期限切れ・使用済みのトークンは400 "Invalid reply token" で拒否される
+            # （ペイロード不正など他の400はpushしても同じく失敗するため、そのまま送出）
+            if not _is_reply_token_error(e):
+                raise
+            print(f"[EventReply] reply token rejected, falling back to push: {e.reason}")
+            LINE_REPLY_FALLBACKS.inc(reason="rejected")
+            return False
+        return True
+
+    async def send(self) -> None:
+        """積んだメッセージを送信（6件目以降はpushで送る）"""
+        messages, self.messages = self.messages, []
+        if not messages:
+            return
+
+        with span("send_reply", messages=len(messages)):
+            if await self._reply(messages[:MAX_MESSAGES_PER_REQUEST]):
+                messages = messages[MAX_MESSAGES_PER_REQUEST:]
+            for i in range(0, len(messages), MAX_MESSAGES_PER_REQUEST):
+                await _call_messaging_api(
+                    "push_message",
+                    {"to": self.user_id, "messages": messages[i:i + MAX_MESSAGES_PER_REQUEST]},
                 )
-            ]
+
+
+def _index_user(line_user_id: str, settings_obj: Optional[UserSettings]) -> None:
+    """配信対象インデックスにユーザー設定を反映"""
+    if settings_obj:
+        recipient_index.upsert(
+            line_user_id,
+            settings_obj.delivery_hour,
+            settings_obj.get_category_mask(),
+            settings_obj.language,
         )
-    )
+    else:
+        recipient_index.upsert(line_user_id)
 
 
 async def register_user(line_user_id: str, display_name: Optional[str] = None) -> User:
@@ -78,11 +227,16 @@ async def register_user(line_user_id: str, display_name: Optional[str] = None) -
             select(User).where(User.line_user_id == line_user_id)
         )
         user = result.scalar_one_or_none()
+        settings_obj = None
 
         if user:
             user.is_active = True
             if display_name:
                 user.display_name = display_name
+            result = await session.execute(
+                select(UserSettings).where(UserSettings.user_id == user.id)
+            )
+            settings_obj = result.scalar_one_or_none()
         else:
             user = User(
                 id=str(uuid.uuid4()),
@@ -93,6 +247,7 @@ async def register_user(line_user_id: str, display_name: Optional[str] = None) -
             session.add(user)
 
         await session.commit()
+        _index_user(line_user_id, settings_obj)
         return user
 
 
@@ -112,6 +267,7 @@ async def ensure_user_registered(line_user_id: str) -> User:
             )
             session.add(user)
             await session.commit()
+            _index_user(line_user_id, None)
             print(f"[ensure_user_registered] New user registered: {line_user_id}")
 
         return user
@@ -129,6 +285,8 @@ async def deactivate_user(line_user_id: str) -> None:
             user.is_active = False
             await session.commit()
 
+        recipient_index.remove(line_user_id)
+
 
 async def add_favorite(line_user_id: str, article_id: str) -> tuple[bool, str]:
     """お気に入り追加
@@ -202,23 +360,60 @@ async def remove_favorite(line_user_id: str, article_id: str) -> bool:
         return True
 
 
-async def get_user_favorites(line_user_id: str) -> List[Article]:
-    """ユーザーのお気に入り記事一覧取得"""
+# お気に入り一覧の1ページあたりの件数（カルーセルは最大12バブル）
+FAVORITES_PAGE_SIZE = 10
+
+
+def encode_favorites_cursor(created_at: datetime, favorite_id: str) -> str:
+    """お気に入りページングのカーソル (created_at, id) を文字列化"""
+    return f"{created_at.isoformat()}_{favorite_id}"
+
+
+def decode_favorites_cursor(cursor: str) -> Optional[Tuple[datetime, str]]:
+    """カーソル文字列を (created_at, id) に戻す（不正な値はNone）"""
+    try:
+        created_at, favorite_id = cursor.split("_", 1)
+        return datetime.fromisoformat(created_at), favorite_id
+    except ValueError:
+        return None
+
+
+async def get_user_favorites_page(
+    line_user_id: str,
+    cursor: Optional[str] = None,
+    limit: int = FAVORITES_PAGE_SIZE,
+) -> Tuple[List[Article], Optional[str]]:
+    """お気に入り記事をキーセットページングで取得（新しい順）
+
+    (user_id, created_at, id) の複合インデックスを1回範囲スキャンするだけで、
+    お気に入り総数に関係なく1ページ分のコストで取得する。
+
+    Returns:
+        Tuple[List[Article], Optional[str]]: (記事一覧, 次ページのカーソル / 最終ページならNone)
+    """
+    query = (
+        select(Article, Favorite.created_at, Favorite.id)
+        .join(Favorite, Favorite.article_id == Article.id)
+        .join(User, User.id == Favorite.user_id)
+        .where(User.line_user_id == line_user_id)
+        .order_by(Favorite.created_at.desc(), Favorite.id.desc())
+        .limit(limit + 1)
+    )
+
+    position = decode_favorites_cursor(cursor) if cursor else None
+    if position:
+        query = query.where(tuple_(Favorite.created_at, Favorite.id) < position)
+
     async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.line_user_id == line_user_id)
-        )
-        user = result.scalar_one_or_none()
-        if not user:
-            return []
+        rows = (await session.execute(query)).all()
 
-        result = await session.execute(
-            select(Article)
-            .join(Favorite, Favorite.article_id == Article.id)
-            .where(Favorite.user_id == user.id)
-            .order_by(Favorite.created_at.desc())
-        )
-        return list(result.scalars().all())
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        _, created_at, favorite_id = rows[-1]
+        next_cursor = encode_favorites_cursor(created_at, favorite_id)
+
+    return [article for article, _, _ in rows], next_cursor
 
 
 # ==================== ユーザー設定関連 ====================
@@ -249,6 +444,8 @@ async def get_user_settings(line_user_id: str) -> Optional[UserSettings]:
             session.add(settings_obj)
             await session.commit()
             await session.refresh(settings_obj)
+            if user.is_active:
+                _index_user(line_user_id, settings_obj)
 
         return settings_obj
 
@@ -282,6 +479,8 @@ async def update_user_delivery_hour(line_user_id: str, hour: int) -> bool:
             settings_obj.delivery_hour = hour
 
         await session.commit()
+        if user.is_active:
+            _index_user(line_user_id, settings_obj)
         return True
 
 
@@ -310,6 +509,8 @@ async def toggle_user_category(line_user_id: str, category: str) -> Optional[boo
 
         new_state = settings_obj.toggle_category(category)
         await session.commit()
+        if user.is_active:
+            _index_user(line_user_id, settings_obj)
         return new_state
 
 
@@ -342,34 +543,80 @@ async def update_user_language(line_user_id: str, language: str) -> bool:
             settings_obj.language = language
 
         await session.commit()
+        if user.is_active:
+            _index_user(line_user_id, settings_obj)
         return True
 
 
-async def get_users_by_delivery_hour(hour: int) -> List[tuple]:
-    """指定時間に配信設定しているアクティブユーザーを取得
+async def get_users_by_delivery_hour(
+    hour: int,
+    batch_size: Optional[int] = None,
+) -> AsyncIterator[List[tuple]]:
+    """指定時間に配信設定しているアクティブユーザーをバッチ単位で取得
 
-    Returns:
+    全件をメモリに載せず、users.id のキーセットで batch_size件ずつ返すため、
+    配信側は読み込み途中から送信を開始できる。バッチごとに短いセッションで取得して
+    閉じてから返すため、配信中（記事の保存・LINE送信）はコネクションやトランザクションを保持しない。
+
+    Yields:
         List[tuple]: [(line_user_id, categories, language), ...]
     """
-    async with async_session() as session:
-        # 設定があるユーザー
-        result = await session.execute(
-            select(User.line_user_id, UserSettings.categories, UserSettings.language)
-            .join(UserSettings, UserSettings.user_id == User.id)
+    batch_size = batch_size or settings.recipient_batch_size
+
+    hour_condition = UserSettings.delivery_hour == hour
+    if hour == 8:
+        # 設定がないユーザー（デフォルト8時）
+        hour_condition = or_(hour_condition, UserSettings.id == None)
+
+    last_id = None
+    while True:
+        query = (
+            select(User.id, User.line_user_id, UserSettings.categories, UserSettings.language)
+            .outerjoin(UserSettings, UserSettings.user_id == User.id)
             .where(User.is_active == True)
-            .where(UserSettings.delivery_hour == hour)
+            .where(hour_condition)
+            .order_by(User.id)
+            .limit(batch_size)
         )
-        users_with_settings = list(result.all())
+        if last_id is not None:
+            query = query.where(User.id > last_id)
 
-        # 設定がないユーザー（デフォルト8時）
-        if hour == 8:
-            result = await session.execute(
-                select(User.line_user_id)
-                .outerjoin(UserSettings, UserSettings.user_id == User.id)
-                .where(User.is_active == True)
-                .where(UserSettings.id == None)
-            )
-            users_without_settings = [(row[0], None, "both") for row in result.all()]
-            users_with_settings.extend(users_without_settings)
+        async with async_session() as session:
+            rows = (await session.execute(query)).all()
+        if not rows:
+            return
+
+        last_id = rows[-1][0]
+        yield [(line_user_id, categories, language or "both") for _, line_user_id, categories, language in rows]
+        if len(rows) < batch_size:
+            return
+
+
+async def get_active_recipients(
+    batch_size: Optional[int] = None,
+) -> AsyncIterator[List[tuple]]:
+    """全アクティブユーザーの配信設定を1クエリでストリーミング取得（配信対象インデックスの初期化用）
+
+    Yields:
+        List[tuple]: [(line_user_id, delivery_hour, category_mask, language), ...]
+        設定がないユーザーは delivery_hour/category_mask が None
+    """
+    batch_size = batch_size or settings.recipient_batch_size
 
-        return users_with_settings
+    async with async_session() as session:
+        result = await session.stream(
+            select(User.line_user_id, UserSettings)
+            .outerjoin(UserSettings, UserSettings.user_id == User.id)
+            .where(User.is_active == True)
+            .execution_options(yield_per=batch_size)
+        )
+        async for partition in result.partitions():
+            yield [
+                (
+                    line_user_id,
+                    settings_obj.delivery_hour if settings_obj else None,
+                    settings_obj.get_category_mask() if settings_obj else None,
+                    settings_obj.language if settings_obj else "both",
+                )
+                for line_user_id, settings_obj in partition
+            ]
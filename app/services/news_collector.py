@@ -1,23 +1,16 @@
+import copy
 import uuid
 import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import List, Optional
-from dataclasses import dataclass
 
-import feedparser
 import httpx
 
 from app.config import settings
-
-
-@dataclass
-class CollectedArticle:
-    url: str
-    title: str
-    summary: str
-    source: str
-    thumbnail_url: Optional[str]
-    published_at: Optional[datetime]
+from app.services.article_record import ArticleRecord
+from app.utils.circuit_breaker import get_circuit_breaker, raise_for_unavailable
+from app.utils.metrics import InstrumentedTransport
 
 
 # AI関連RSSフィード一覧
@@ -41,7 +34,11 @@ RSS_FEEDS = [
 ]
 
 # Hacker News API
-HN_API_BASE = "https://hacker-news.firebaseio.com/v0"
+HN_API_HOST = "hacker-news.firebaseio.com"
+HN_API_BASE = f"https://{HN_API_HOST}/v0"
+
+# フィード・HNは1サイクルに1回しか呼ばないため、1回の失敗でブレーカーを開く
+SOURCE_FAILURE_THRESHOLD = 1
 
 # カテゴリごとのキーワード定義
 CATEGORY_KEYWORDS = {
@@ -68,14 +65,72 @@ CATEGORY_KEYWORDS = {
 }
 
 
+_parse_executor: Optional[Executor] = None
+
+
+def get_parse_executor() -> Executor:
+    """フィード解析用のワーカープール（初回呼び出し時に作成）"""
+    global _parse_executor
+    if _parse_executor is None:
+        if settings.feed_parse_executor == "process":
+            _parse_executor = ProcessPoolExecutor(max_workers=settings.feed_parse_workers)
+        else:
+            _parse_executor = ThreadPoolExecutor(
+                max_workers=settings.feed_parse_workers,
+                thread_name_prefix="feed-parse",
+            )
+    return _parse_executor
+
+
+def shutdown_parse_executor() -> None:
+    """フィード解析用のワーカープールを停止"""
+    global _parse_executor
+    if _parse_executor is not None:
+        _parse_executor.shutdown(wait=False, cancel_futures=True)
+        _parse_executor = None
+
+
+def parse_feed(body: bytes, source: str, cutoff_time: datetime) -> List[ArticleRecord]:
+    """フィード本文を解析して記事リストに変換（ワーカープール内で実行）"""
+    import feedparser
+
+    feed = feedparser.parse(body)
+    articles = []
+
+    for entry in feed.entries:
+        published = NewsCollector._parse_feed_date(entry)
+        if published and published < cutoff_time:
+            continue
+
+        article = ArticleRecord(
+            url=entry.get("link", ""),
+            title=entry.get("title", "")[:500],
+            summary=NewsCollector._clean_summary(entry.get("summary", ""))[:500],
+            source=source,
+            thumbnail_url=NewsCollector._extract_thumbnail(entry),
+            published_at=published,
+            canonical_url=NewsCollector._extract_canonical_url(entry),
+        )
+        if article.url and article.title:
+            articles.append(article)
+
+    return articles
+
+
+def _copy_articles(articles: List[ArticleRecord]) -> List[ArticleRecord]:
+    return [copy.copy(article) for article in articles]
+
+
 class NewsCollector:
     def __init__(self):
-        self.client = httpx.AsyncClient(timeout=30.0)
+        self.client = httpx.AsyncClient(timeout=30.0, transport=InstrumentedTransport())
+        # 最後に成功した結果で代わりに応答したソース（ブレーカー名）
+        self.stale_sources = set()
 
     async def close(self):
         await self.client.aclose()
 
-    async def collect_all(self, hours: int = 24) -> List[CollectedArticle]:
+    async def collect_all(self, hours: int = 24) -> List[ArticleRecord]:
         """全ソースから記事を収集"""
         articles = []
         cutoff_time = datetime.utcnow() - timedelta(hours=hours)
@@ -88,92 +143,127 @@ class NewsCollector:
         hn_articles = await self._collect_from_hackernews(cutoff_time)
         articles.extend(hn_articles)
 
-        # 重複排除（URLベース）
-        seen_urls = set()
-        unique_articles = []
-        for article in articles:
-            normalized_url = self._normalize_url(article.url)
-            if normalized_url not in seen_urls:
-                seen_urls.add(normalized_url)
-                unique_articles.append(article)
+        # 重複統合（正規化URL + タイトル類似度）、掲載ソース数を集計
+        from app.services.article_dedup import dedupe_articles
 
-        return unique_articles
+        unique_articles = dedupe_articles(articles)
+        print(f"重複統合: {len(articles)}件 -> {len(unique_articles)}件")
 
-    async def _collect_from_rss(self, cutoff_time: datetime) -> List[CollectedArticle]:
-        """RSSフィードから記事収集"""
-        articles = []
-
-        for feed_info in RSS_FEEDS:
-            try:
-                response = await self.client.get(feed_info["url"])
-                feed = feedparser.parse(response.text)
-
-                for entry in feed.entries:
-                    published = self._parse_feed_date(entry)
-                    if published and published < cutoff_time:
-                        continue
-
-                    article = CollectedArticle(
-                        url=entry.get("link", ""),
-                        title=entry.get("title", "")[:500],
-                        summary=self._clean_summary(entry.get("summary", ""))[:500],
-                        source=feed_info["name"],
-                        thumbnail_url=self._extract_thumbnail(entry),
-                        published_at=published,
-                    )
-                    if article.url and article.title:
-                        articles.append(article)
-
-            except Exception as e:
-                print(f"RSS収集エラー ({feed_info['name']}): {e}")
-                continue
+        return unique_articles
 
-        return articles
+    async def _call_source(self, name: str, key: str, fetch, cutoff_time: datetime) -> List[ArticleRecord]:
+        """ソースのサーキットブレーカー経由で記事を取得（落ちている間は最後に取得できた記事）
+
+        取得した記事はそのまま保持し、スコアリング・重複統合で書き換えられないよう
+        呼び出し元にはコピーを返す（取得時も代用時もコピーは1回）。
+        """
+        breaker = get_circuit_breaker(name, failure_threshold=SOURCE_FAILURE_THRESHOLD)
+        result = await breaker.call(key, fetch)
+        if not result.stale:
+            return _copy_articles(result.value)
+
+        self.stale_sources.add(name)
+        return [
+            copy.copy(article)
+            for article in result.value
+            if article.published_at is None or article.published_at >= cutoff_time
+        ]
+
+    async def _collect_from_rss(self, cutoff_time: datetime) -> List[ArticleRecord]:
+        """RSSフィードから記事収集（フィードごとに並行して取得）"""
+        results = await asyncio.gather(*(self._collect_from_feed(feed_info, cutoff_time) for feed_info in RSS_FEEDS))
+        return [article for feed_articles in results for article in feed_articles]
+
+    async def _collect_from_feed(self, feed_info: dict, cutoff_time: datetime) -> List[ArticleRecord]:
+        """1つのRSSフィードから記事収集"""
+        async def fetch() -> List[ArticleRecord]:
+            body = await self._fetch_feed_body(feed_info["url"])
+            # 解析はワーカープールで行い、webhook処理をブロックしない
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(get_parse_executor(), parse_feed, body, feed_info["name"], cutoff_time)
 
-    async def _collect_from_hackernews(self, cutoff_time: datetime) -> List[CollectedArticle]:
+        try:
+            return await self._call_source(f"feed:{feed_info['name']}", feed_info["url"], fetch, cutoff_time)
+        except Exception as e:
+            # 停止中で代わりに返せる記事もない場合（CircuitOpenError）も出力する
+            print(f"RSS収集エラー ({feed_info['name']}): {e}")
+        return []
+
+    async def _fetch_feed_body(self, url: str) -> bytes:
+        """フィード本文をストリーミング取得（feed_max_bytesを超えた分は読まずに打ち切る）"""
+        max_bytes = settings.feed_max_bytes
+        chunks = []
+        size = 0
+
+        async with self.client.stream("GET", url) as response:
+            raise_for_unavailable(response)
+            content_length = response.headers.get("Content-Length")
+            if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+                print(f"RSSサイズ超過のため先頭{max_bytes}バイトのみ解析: {url} ({content_length} bytes)")
+
+            async for chunk in response.aiter_bytes():
+                remaining = max_bytes - size
+                if len(chunk) >= remaining:
+                    chunks.append(chunk[:remaining])
+                    size = max_bytes
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+
+        return b"".join(chunks)
+
+    async def _collect_from_hackernews(self, cutoff_time: datetime) -> List[ArticleRecord]:
         """Hacker Newsから記事収集（AI関連のみ）"""
+        try:
+            return await self._call_source(
+                HN_API_HOST, "topstories", lambda: self._fetch_hackernews(cutoff_time), cutoff_time
+            )
+        except Exception as e:
+            # 停止中で代わりに返せる記事もない場合（CircuitOpenError）も出力する
+            print(f"Hacker News収集エラー: {e}")
+        return []
+
+    async def _fetch_hackernews(self, cutoff_time: datetime) -> List[ArticleRecord]:
+        """Hacker NewsのTop Storiesを取得（Top Storiesが取れなければ例外）"""
         articles = []
         ai_keywords = ["ai", "artificial intelligence", "machine learning", "ml",
                        "gpt", "llm", "openai", "anthropic", "claude", "chatgpt",
                        "deep learning", "neural", "transformer"]
 
-        try:
-            # Top Stories取得
-            response = await self.client.get(f"{HN_API_BASE}/topstories.json")
-            story_ids = response.json()[:100]  # 上位100件
+        # Top Stories取得
+        response = await self.client.get(f"{HN_API_BASE}/topstories.json")
+        raise_for_unavailable(response)
+        story_ids = response.json()[:100]  # 上位100件
 
-            # 並列で記事詳細取得
-            tasks = [self._fetch_hn_story(story_id) for story_id in story_ids[:50]]
-            stories = await asyncio.gather(*tasks, return_exceptions=True)
-
-            for story in stories:
-                if isinstance(story, Exception) or not story:
-                    continue
+        # 並列で記事詳細取得
+        tasks = [self._fetch_hn_story(story_id) for story_id in story_ids[:50]]
+        stories = await asyncio.gather(*tasks, return_exceptions=True)
 
-                title_lower = story.get("title", "").lower()
-                if not any(kw in title_lower for kw in ai_keywords):
-                    continue
+        for story in stories:
+            if isinstance(story, Exception) or not story:
+                continue
 
-                published = datetime.fromtimestamp(story.get("time", 0))
-                if published < cutoff_time:
-                    continue
+            title_lower = story.get("title", "").lower()
+            if not any(kw in title_lower for kw in ai_keywords):
+                continue
 
-                url = story.get("url", "")
-                if not url:
-                    url = f"https://news.ycombinator.com/item?id={story.get('id')}"
+            published = datetime.fromtimestamp(story.get("time", 0))
+            if published < cutoff_time:
+                continue
 
-                article = CollectedArticle(
-                    url=url,
-                    title=story.get("title", "")[:500],
-                    summary="",
-                    source="Hacker News",
-                    thumbnail_url=None,
-                    published_at=published,
-                )
-                articles.append(article)
+            url = story.get("url", "")
+            if not url:
+                url = f"https://news.ycombinator.com/item?id={story.get('id')}"
 
-        except Exception as e:
-            print(f"Hacker News収集エラー: {e}")
+            article = ArticleRecord(
+                url=url,
+                title=story.get("title", "")[:500],
+                summary="",
+                source="Hacker News",
+                thumbnail_url=None,
+                published_at=published,
+            )
+            articles.append(article)
 
         return articles
 
@@ -185,7 +275,8 @@ class NewsCollector:
         except Exception:
             return None
 
-    def _parse_feed_date(self, entry) -> Optional[datetime]:
+    @staticmethod
+    def _parse_feed_date(entry) -> Optional[datetime]:
         """RSSフィードの日付をパース"""
         date_fields = ["published_parsed", "updated_parsed", "created_parsed"]
         for field in date_fields:
@@ -197,14 +288,16 @@ class NewsCollector:
                     continue
         return None
 
-    def _clean_summary(self, summary: str) -> str:
+    @staticmethod
+    def _clean_summary(summary: str) -> str:
         """サマリーからHTMLタグを除去"""
         import re
         clean = re.sub(r"<[^>]+>", "", summary)
         clean = re.sub(r"\s+", " ", clean).strip()
         return clean
 
-    def _extract_thumbnail(self, entry) -> Optional[str]:
+    @staticmethod
+    def _extract_thumbnail(entry) -> Optional[str]:
         """記事からサムネイルURLを抽出"""
         # media:thumbnail
         if hasattr(entry, "media_thumbnail") and entry.media_thumbnail:
@@ -218,11 +311,14 @@ class NewsCollector:
 
         return None
 
-    def _normalize_url(self, url: str) -> str:
-        """URLを正規化して重複判定用に使用"""
-        url = url.lower().strip()
-        url = url.rstrip("/")
-        # クエリパラメータを除去
-        if "?" in url:
-            url = url.split("?")[0]
-        return url
+    @staticmethod
+    def _extract_canonical_url(entry) -> Optional[str]:
+        """フィードに含まれる正規URL（feedburner:origLink / rel=canonical）を抽出"""
+        if entry.get("feedburner_origlink"):
+            return entry.feedburner_origlink
+
+        for link in entry.get("links", []):
+            if link.get("rel") == "canonical" and link.get("href"):
+                return link["href"]
+
+        return None
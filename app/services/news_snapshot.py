@@ -0,0 +1,123 @@
+"""スコアリング済み記事のスナップショット（stale-while-revalidate）
+
+get_top_articles は毎回 収集 → スコアリング → 時系列記録 を行い、結果を
+スナップショットとして保持する。「今日のニュース」ボタンのようなオンデマンド要求は
+get_cached_top_articles でスナップショットから即座にランキングを返す。
+  - NEWS_SNAPSHOT_MAX_AGE_SECONDS 以内 : そのまま返す（fresh）
+  - それより古い                       : そのまま返しつつ、バックグラウンドで1回だけ再計算（stale）
+  - まだない                           : 計算を待って返す（miss。同時に来た要求は同じ計算を待つ）
+"""
+import time
+import asyncio
+from typing import Container, Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.services.article_record import ArticleRecord
+from app.utils.metrics import NEWS_SNAPSHOT_REQUESTS, NEWS_SNAPSHOT_STALE_SOURCES, PIPELINE_STAGE_SECONDS
+
+
+class NewsSnapshot:
+    """ある時点のスコアリング済み記事とランキングエンジン
+
+    stale_sources は収集・スコアリング時に落ちていて、最後に取得できた結果で代用したソース。
+    """
+
+    def __init__(
+        self,
+        articles: List[ArticleRecord],
+        baselines: Optional[Dict[str, Tuple]] = None,
+        stale_sources: Iterable[str] = (),
+    ):
+        from app.services.ranking import RankingEngine
+
+        self.articles = articles
+        self.stale_sources = frozenset(stale_sources)
+        self.ranking = RankingEngine(articles, baselines=baselines)
+        self.ranking.apply_popularity_scores()
+        self.taken_at = time.monotonic()
+
+    @property
+    def age_seconds(self) -> float:
+        return time.monotonic() - self.taken_at
+
+    @property
+    def stale(self) -> bool:
+        return bool(self.stale_sources)
+
+    def top(
+        self,
+        count: int,
+        categories: Optional[List[str]] = None,
+        language: str = "both",
+        seen: Optional[Container[str]] = None,
+    ) -> List[ArticleRecord]:
+        with PIPELINE_STAGE_SECONDS.time(stage="rank"):
+            return self.ranking.top(count, categories, language, seen=seen)
+
+
+class NewsSnapshotCache:
+    def __init__(self):
+        self.snapshot: Optional[NewsSnapshot] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def store(self, snapshot: NewsSnapshot) -> None:
+        previous = self.snapshot
+        self.snapshot = snapshot
+        # 前回 stale だったソースは回復していれば0に戻す
+        if previous is not None:
+            for source in previous.stale_sources - snapshot.stale_sources:
+                NEWS_SNAPSHOT_STALE_SOURCES.set(0, source=source)
+        for source in snapshot.stale_sources:
+            NEWS_SNAPSHOT_STALE_SOURCES.set(1, source=source)
+
+    def clear(self) -> None:
+        self.snapshot = None
+
+    def _start_refresh(self) -> asyncio.Task:
+        """再計算タスクを開始（実行中ならそのタスクを返す）"""
+        if self._refresh_task is None or self._refresh_task.done():
+            from app.services.social_scorer import build_news_snapshot
+
+            self._refresh_task = asyncio.create_task(build_news_snapshot())
+            self._refresh_task.add_done_callback(self._on_refreshed)
+        return self._refresh_task
+
+    @staticmethod
+    def _on_refreshed(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[NewsSnapshotCache] refresh error: {task.exception()}")
+
+    async def get(self, max_age_seconds: Optional[float] = None) -> NewsSnapshot:
+        """スナップショットを取得（古ければ返したうえでバックグラウンド更新）"""
+        if max_age_seconds is None:
+            max_age_seconds = settings.news_snapshot_max_age_seconds
+
+        snapshot = self.snapshot
+        if snapshot is None:
+            NEWS_SNAPSHOT_REQUESTS.inc(result="miss")
+            # 待っている呼び出し元がキャンセルされても計算は続ける
+            return await asyncio.shield(self._start_refresh())
+
+        if snapshot.age_seconds > max_age_seconds:
+            NEWS_SNAPSHOT_REQUESTS.inc(result="stale")
+            self._start_refresh()
+        else:
+            NEWS_SNAPSHOT_REQUESTS.inc(result="fresh")
+        return snapshot
+
+
+news_snapshot_cache = NewsSnapshotCache()
+
+
+async def get_cached_top_articles(
+    count: int = 5,
+    categories: Optional[List[str]] = None,
+    language: str = "both",
+    seen: Optional[Container[str]] = None,
+) -> List[ArticleRecord]:
+    """直近のスナップショットから人気記事Top Nを取得（オンデマンド要求用）
+
+    ソースが落ちていて前回の値で代用した指標を持つ記事は social_stale が True になる。
+    """
+    snapshot = await news_snapshot_cache.get()
+    return snapshot.top(count, categories, language, seen=seen)
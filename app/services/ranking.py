@@ -0,0 +1,203 @@
+"""列指向の記事ランキング
+
+スコアリング済み記事の各指標（はてブ / HN / Reddit / ソース数 / 経過時間）と
+カテゴリ・言語の判定結果をNumPy配列で保持し、重み付けスコアと時間減衰スコアを
+1回のベクトル演算で計算する。セグメント（カテゴリ × 言語）ごとのTop Nは
+argpartition で選ぶため、候補記事が数千件あっても全件ソートしない。
+
+ランキングモード（設定 RANKING_MODE）:
+  - "popularity" : 重み付きの累計値（はてブ / HN / Reddit / ソース数）を時間減衰
+  - "trending"   : 時間窓内の最古サンプルからの重み付き増加量 / 経過時間（1時間あたり）を
+                   時間減衰。サンプルのない記事は公開時点を0件とみなす
+
+    engine = RankingEngine(scored_articles)
+    top = engine.top(5, categories=["llm"], language="ja")
+"""
+from datetime import datetime
+from typing import Container, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.models.user_settings import CATEGORY_BITS, categories_to_mask
+from app.services.article_record import ArticleRecord
+from app.services.social_scorer import WEIGHTS, detect_language, match_category
+from app.utils.flex_message import _generate_article_id
+
+# セグメント: (カテゴリのビットマスク（0は絞り込みなし）, 言語)
+Segment = Tuple[int, str]
+
+# 増加速度を測る最短の経過時間（これより新しい基準点は使わない）
+MIN_VELOCITY_HOURS = 1.0
+
+
+class RankingEngine:
+    def __init__(
+        self,
+        articles: List[ArticleRecord],
+        now: Optional[datetime] = None,
+        baselines: Optional[Dict[str, Tuple[datetime, int, int]]] = None,
+    ):
+        self.articles = articles
+        now = now or datetime.utcnow()
+        count = len(articles)
+
+        self.hatena = np.fromiter((a.hatena_count for a in articles), dtype=np.float64, count=count)
+        self.hackernews = np.fromiter((a.hackernews_score for a in articles), dtype=np.float64, count=count)
+        self.reddit = np.fromiter((a.reddit_score for a in articles), dtype=np.float64, count=count)
+        self.source_count = np.fromiter((a.source_count for a in articles), dtype=np.float64, count=count)
+        # 公開日時不明の記事は経過0時間として扱う
+        self.age_hours = np.fromiter(
+            ((now - a.published_at).total_seconds() / 3600 if a.published_at else 0.0 for a in articles),
+            dtype=np.float64,
+            count=count,
+        ).clip(min=0.0)
+
+        # トレンド用の基準点（URL -> (ts, hatena, hn)）
+        # 基準点がない・新しすぎる記事は公開時点を0件とみなす
+        baselines = baselines or {}
+        base = [baselines.get(a.url) for a in articles]
+        base = [
+            b if b and (now - b[0]).total_seconds() / 3600 >= MIN_VELOCITY_HOURS else None
+            for b in base
+        ]
+        self.base_hatena = np.fromiter((b[1] if b else 0 for b in base), dtype=np.float64, count=count)
+        self.base_hackernews = np.fromiter((b[2] if b else 0 for b in base), dtype=np.float64, count=count)
+        self.base_elapsed_hours = np.fromiter(
+            ((now - b[0]).total_seconds() / 3600 if b else age for b, age in zip(base, self.age_hours.tolist())),
+            dtype=np.float64,
+            count=count,
+        )
+
+        # カテゴリ・言語の判定は記事ごとに1回だけ行い、記事レコードに保持する
+        for a in articles:
+            if a.category_mask is None:
+                a.category_mask = self._category_mask(a)
+            if a.language is None:
+                a.language = detect_language(a.title)
+        self.category_bits = np.fromiter((a.category_mask for a in articles), dtype=np.int64, count=count)
+        self.language = np.array([a.language for a in articles], dtype="<U2")
+
+    @staticmethod
+    def _category_mask(article: ArticleRecord) -> int:
+        search_text = f"{article.title} {article.summary}"
+        mask = 0
+        for category, bit in CATEGORY_BITS.items():
+            if match_category(search_text, [category]):
+                mask |= bit
+        return mask
+
+    def weighted_scores(self, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """重み付きの人気スコア（時間減衰なし）"""
+        weights = weights or WEIGHTS
+        return (
+            self.hatena * weights["hatena"]
+            + self.hackernews * weights["hackernews"]
+            + self.reddit * weights["reddit"]
+            + (self.source_count - 1) * weights["source_count"]
+        )
+
+    def velocity_scores(self, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """基準点からの重み付き増加量（1時間あたり）"""
+        weights = weights or WEIGHTS
+        delta = (
+            (self.hatena - self.base_hatena) * weights["hatena"]
+            + (self.hackernews - self.base_hackernews) * weights["hackernews"]
+        ).clip(min=0.0)
+        return delta / np.maximum(self.base_elapsed_hours, MIN_VELOCITY_HOURS)
+
+    def rank_scores(
+        self,
+        weights: Optional[Dict[str, float]] = None,
+        half_life_hours: Optional[float] = None,
+        mode: Optional[str] = None,
+    ) -> np.ndarray:
+        """ランキング用スコア（人気スコア or 増加速度を公開からの経過時間で半減期減衰）"""
+        if half_life_hours is None:
+            half_life_hours = settings.ranking_half_life_hours
+        mode = mode or settings.ranking_mode
+        if mode == "trending":
+            scores = self.velocity_scores(weights)
+        else:
+            scores = self.weighted_scores(weights)
+        if half_life_hours > 0:
+            scores = scores * np.exp2(-self.age_hours / half_life_hours)
+        return scores
+
+    def apply_popularity_scores(self, weights: Optional[Dict[str, float]] = None) -> None:
+        """人気スコア（DB保存・表示用）を各記事に書き戻す"""
+        for article, score in zip(self.articles, self.weighted_scores(weights).astype(np.int64).tolist()):
+            article.popularity_score = score
+
+    def _eligible(self, category_mask: int, language: str) -> np.ndarray:
+        eligible = np.ones(len(self.articles), dtype=bool)
+        if category_mask:
+            eligible &= (self.category_bits & category_mask) != 0
+        if language != "both":
+            eligible &= self.language == language
+        return eligible
+
+    def _top_indices(
+        self,
+        scores: np.ndarray,
+        eligible: np.ndarray,
+        count: int,
+        seen: Optional[Container[str]] = None,
+    ) -> np.ndarray:
+        candidates = np.flatnonzero(eligible)
+        if count <= 0 or not len(candidates):
+            return candidates[:0]
+        if seen is None:
+            if len(candidates) > count:
+                candidates = candidates[np.argpartition(-scores[candidates], count - 1)[:count]]
+            # 同点は収集順を保つ
+            return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        # 配信済みの記事を飛ばして下位から補充する（まず上位 count * 4 件から探す）
+        window = min(len(candidates), count * 4)
+        while True:
+            if window < len(candidates):
+                top = candidates[np.argpartition(-scores[candidates], window - 1)[:window]]
+            else:
+                top = candidates
+            ordered = top[np.argsort(-scores[top], kind="stable")]
+            picked = [
+                i for i in ordered.tolist()
+                if _generate_article_id(self.articles[i].url) not in seen
+            ][:count]
+            if len(picked) == count or window == len(candidates):
+                return np.array(picked, dtype=np.int64)
+            window = min(len(candidates), window * 4)
+
+    def top(
+        self,
+        count: int,
+        categories: Optional[List[str]] = None,
+        language: str = "both",
+        weights: Optional[Dict[str, float]] = None,
+        half_life_hours: Optional[float] = None,
+        mode: Optional[str] = None,
+        seen: Optional[Container[str]] = None,
+    ) -> List[ArticleRecord]:
+        """カテゴリ/言語で絞り込んだTop N（seen に含まれる article_id の記事は除く）"""
+        scores = self.rank_scores(weights, half_life_hours, mode)
+        category_mask = categories_to_mask(categories) if categories else 0
+        indices = self._top_indices(scores, self._eligible(category_mask, language), count, seen)
+        return [self.articles[i] for i in indices.tolist()]
+
+    def top_by_segment(
+        self,
+        count: int,
+        segments: Iterable[Segment],
+        weights: Optional[Dict[str, float]] = None,
+        half_life_hours: Optional[float] = None,
+        mode: Optional[str] = None,
+    ) -> Dict[Segment, List[ArticleRecord]]:
+        """複数セグメントのTop Nをまとめて計算（スコアは1回だけ計算する）"""
+        scores = self.rank_scores(weights, half_life_hours, mode)
+        results = {}
+        for segment in set(segments):
+            category_mask, language = segment
+            indices = self._top_indices(scores, self._eligible(category_mask, language), count)
+            results[segment] = [self.articles[i] for i in indices.tolist()]
+        return results
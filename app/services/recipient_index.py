@@ -0,0 +1,120 @@
+from typing import Dict, List, Optional, Tuple
+
+from app.models.user_settings import mask_to_categories
+
+# 設定がないユーザーの配信時間
+DEFAULT_DELIVERY_HOUR = 8
+
+
+class RecipientIndex:
+    """配信対象ユーザーのインメモリインデックス
+
+    配信時間（0-23）ごとのバケットに (line_user_id -> (カテゴリビットマスク, 言語)) を保持する。
+    起動時にDBから読み込み、以降はfollow/unfollowと設定更新時に差分更新する。
+    カテゴリビットマスクがNoneのユーザーは設定未作成（カテゴリで絞り込まない）。
+
+    load() は新しいバケットに読み込んでから入れ替えるため、読み込み中も既存のインデックスで
+    配信できる。読み込み中の差分更新は記録しておき、入れ替え前に新しいバケットへ再適用する
+    （読み込み開始前の古い行で上書きされない）。
+    """
+
+    def __init__(self):
+        self._buckets: List[Dict[str, Tuple[Optional[int], str]]] = [{} for _ in range(24)]
+        self._hour_of: Dict[str, int] = {}
+        self.loaded = False
+        # load() 中に行われた差分更新（読み込み中でなければNone）
+        self._pending: Optional[List[tuple]] = None
+
+    def __len__(self) -> int:
+        return len(self._hour_of)
+
+    def upsert(
+        self,
+        line_user_id: str,
+        hour: Optional[int] = None,
+        category_mask: Optional[int] = None,
+        language: Optional[str] = None,
+    ) -> None:
+        """ユーザーを登録・更新（既存のバケットからは移動する）"""
+        if self._pending is not None:
+            self._pending.append((line_user_id, hour, category_mask, language))
+        self._upsert(line_user_id, hour, category_mask, language)
+
+    def remove(self, line_user_id: str) -> None:
+        """ユーザーを削除（unfollow時）"""
+        if self._pending is not None:
+            self._pending.append((line_user_id,))
+        self._remove(line_user_id)
+
+    def _upsert(
+        self,
+        line_user_id: str,
+        hour: Optional[int],
+        category_mask: Optional[int],
+        language: Optional[str],
+    ) -> None:
+        if hour is None:
+            hour = DEFAULT_DELIVERY_HOUR
+        if not 0 <= hour <= 23:
+            return
+
+        self._remove(line_user_id)
+        self._buckets[hour][line_user_id] = (category_mask, language or "both")
+        self._hour_of[line_user_id] = hour
+
+    def _remove(self, line_user_id: str) -> None:
+        hour = self._hour_of.pop(line_user_id, None)
+        if hour is not None:
+            self._buckets[hour].pop(line_user_id, None)
+
+    def get_recipients(self, hour: int) -> List[tuple]:
+        """指定時間の配信対象ユーザーを取得
+
+        Returns:
+            List[tuple]: [(line_user_id, categories, language), ...]
+        """
+        return [
+            (
+                line_user_id,
+                mask_to_categories(mask) if mask is not None else None,
+                language,
+            )
+            for line_user_id, (mask, language) in self._buckets[hour].items()
+        ]
+
+    def clear(self) -> None:
+        for bucket in self._buckets:
+            bucket.clear()
+        self._hour_of.clear()
+        self.loaded = False
+
+    async def load(self) -> None:
+        """DBからアクティブユーザーを読み込んでインデックスを再構築"""
+        from app.services.line_service import get_active_recipients
+
+        # 読み込みが重なった場合は最初の load() が記録を管理する
+        owns_pending = self._pending is None
+        if owns_pending:
+            self._pending = []
+        try:
+            fresh = RecipientIndex()
+            async for batch in get_active_recipients():
+                for line_user_id, hour, category_mask, language in batch:
+                    fresh._upsert(line_user_id, hour, category_mask, language)
+
+            # 読み込み中の差分更新を再適用してから入れ替える（この間にawaitしない）
+            for change in self._pending:
+                if len(change) == 1:
+                    fresh._remove(*change)
+                else:
+                    fresh._upsert(*change)
+            self._buckets = fresh._buckets
+            self._hour_of = fresh._hour_of
+            self.loaded = True
+        finally:
+            if owns_pending:
+                self._pending = None
+        print(f"[RecipientIndex] Loaded {len(self)} active users")
+
+
+recipient_index = RecipientIndex()
@@ -1,18 +1,26 @@
 import json
+import time
 import uuid
 import asyncio
 from datetime import datetime
-from typing import Optional, List
-
-import pytz
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
+from typing import Optional, List, TYPE_CHECKING
 
 from app.config import settings
 from app.models import Article, async_session
 from app.utils.flex_message import create_news_carousel, _generate_article_id
+from app.utils.metrics import DELIVERY_LAST_RUN, DELIVERY_RUNS, PIPELINE_STAGE_SECONDS
+from app.utils.profiling import profiled
+from app.services.leader_election import LeaderElection
+
+# apscheduler / pytz はスケジューラー起動時に読み込む（起動時間短縮のため）
+if TYPE_CHECKING:
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+    from app.services.line_service import EventReply
+
+scheduler: Optional["AsyncIOScheduler"] = None
 
-scheduler: Optional[AsyncIOScheduler] = None
+# スケジューラーの遅延（イベントループの詰まり等）で毎時0分を過ぎても実行する猶予
+HOURLY_MISFIRE_GRACE_SECONDS = 30 * 60
 
 
 def setup_scheduler():
@@ -23,6 +31,10 @@ def setup_scheduler():
         print("LINE credentials not set. Scheduler disabled.")
         return
 
+    import pytz
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+    from apscheduler.triggers.cron import CronTrigger
+
     scheduler = AsyncIOScheduler()
     jst = pytz.timezone(settings.timezone)
 
@@ -35,6 +47,20 @@ def setup_scheduler():
         ),
         id="hourly_news_delivery",
         replace_existing=True,
+        misfire_grace_time=HOURLY_MISFIRE_GRACE_SECONDS,
+        coalesce=True,
+    )
+
+    # 毎日、保持期間を過ぎた記事を削除
+    scheduler.add_job(
+        article_retention,
+        CronTrigger(
+            hour=settings.article_retention_hour,
+            minute=30,
+            timezone=jst,
+        ),
+        id="article_retention",
+        replace_existing=True,
     )
 
     scheduler.start()
@@ -46,82 +72,207 @@ def shutdown_scheduler():
     global scheduler
     if scheduler:
         scheduler.shutdown()
+        scheduler = None
         print("Scheduler shutdown complete")
 
 
+def _on_elected():
+    """リーダーに選ばれたらスケジューラーを起動し、この時間の配信が未実行なら実行する
+
+    リーダー不在の間やフェイルオーバー中に毎時0分を過ぎた場合、新しいスケジューラーの
+    CronTriggerは次の0分からしか実行しないため、その時間のユーザーに配信されなくなる。
+    実行済みかどうかは hourly_news_delivery がリース行の記録（claim_run）で判定する。
+    """
+    setup_scheduler()
+    if scheduler is not None:
+        scheduler.add_job(hourly_news_delivery, id="hourly_news_delivery_catchup", replace_existing=True)
+
+
+# 複数ワーカー構成では、リーダーに選ばれたプロセスだけがスケジューラーを起動する
+scheduler_leader = LeaderElection(
+    "hourly_news_delivery",
+    on_elected=_on_elected,
+    on_demoted=shutdown_scheduler,
+)
+
+
+@profiled("hourly_news_delivery")
 async def hourly_news_delivery():
     """毎時のニュース配信ジョブ（ユーザー設定に基づく）"""
-    from app.services.social_scorer import get_top_articles
-    from app.services.line_service import send_flex_message, get_users_by_delivery_hour
+    import pytz
+    from app.services.social_scorer import build_news_snapshot
+    from app.services.line_service import send_flex_message
+    from app.services.delivery_history import load_histories, save_histories
+
+    if settings.scheduler_leader_election and not scheduler_leader.is_leader:
+        # リーダー権を失った直後に発火したジョブは配信しない
+        print("Hourly news delivery skipped: not the scheduler leader")
+        return
 
     jst = pytz.timezone(settings.timezone)
-    current_hour = datetime.now(jst).hour
+    now = datetime.now(jst)
+    current_hour = now.hour
+
+    # この時間の配信が実行済み（前のリーダー・定時実行と取りこぼし分の実行が重なった等）なら何もしない
+    try:
+        if not await scheduler_leader.claim_run(now.strftime("%Y-%m-%dT%H")):
+            print(f"Hourly news delivery skipped: {current_hour}:00 already delivered")
+            DELIVERY_RUNS.inc(result="skipped")
+            return
+    except Exception as e:
+        # 記録できなくても配信は行う（配信済み記事は配信履歴で除外される）
+        print(f"Hourly news delivery run marker error: {e}")
 
     print(f"Hourly news delivery started for {current_hour}:00 JST...")
 
+    started = time.perf_counter()
+    summary = {"users": 0, "delivered": 0, "no_articles": 0, "errors": 0}
+    result = "success"
+    # 収集・スコアリングは1回の配信で1回だけ（配信対象がいる場合のみ、最初のバッチの前に行う）
+    snapshot = None
+
     try:
-        # この時間に配信するユーザーを取得
-        users = await get_users_by_delivery_hour(current_hour)
-        print(f"Users to deliver: {len(users)}")
+        # この時間に配信するユーザーをバッチ単位で取得しながら順次配信
+        total_users = 0
+        async for users in _iter_recipient_batches(current_hour):
+            total_users += len(users)
+            summary["users"] = total_users
+            print(f"Users to deliver: {len(users)} (total {total_users})")
+
+            if snapshot is None:
+                # 失敗した場合はユーザーごとにやり直さず、配信全体をエラーにする
+                snapshot = await build_news_snapshot()
+
+            # 配信済み記事の履歴をバッチ単位で読み込む
+            histories = {}
+            if settings.delivery_history_enabled:
+                histories = await load_histories([user_data[0] for user_data in users])
+
+            # 各ユーザーに配信
+            for user_data in users:
+                line_user_id = user_data[0]
+                categories_json = user_data[1]
+                language = user_data[2] or "both"
+
+                # カテゴリをパース
+                categories = None
+                if categories_json:
+                    try:
+                        categories = json.loads(categories_json) if isinstance(categories_json, str) else categories_json
+                    except json.JSONDecodeError:
+                        categories = None
 
-        if not users:
-            print(f"No users scheduled for {current_hour}:00")
-            return
+                try:
+                    # ユーザー設定に基づいて記事取得
+                    history = histories.get(line_user_id)
+                    top_articles = snapshot.top(
+                        count=settings.max_articles_per_delivery,
+                        categories=categories,
+                        language=language,
+                        seen=history,
+                    )
 
-        # 各ユーザーに配信
-        for user_data in users:
-            line_user_id = user_data[0]
-            categories_json = user_data[1]
-            language = user_data[2] or "both"
+                    if not top_articles:
+                        print(f"No articles for user {line_user_id[:8]}...")
+                        summary["no_articles"] += 1
+                        continue
+
+                    # DBに記事を保存
+                    await _save_articles_to_db(top_articles)
+
+                    # Flex Message送信
+                    with PIPELINE_STAGE_SECONDS.time(stage="render"):
+                        flex_content = create_news_carousel(top_articles)
+                    await send_flex_message(
+                        line_user_id,
+                        f"本日のAIニュース TOP{len(top_articles)}",
+                        flex_content,
+                    )
 
-            # カテゴリをパース
-            categories = None
-            if categories_json:
-                try:
-                    categories = json.loads(categories_json) if isinstance(categories_json, str) else categories_json
-                except json.JSONDecodeError:
-                    categories = None
-
-            try:
-                # ユーザー設定に基づいて記事取得
-                top_articles = await get_top_articles(
-                    count=settings.max_articles_per_delivery,
-                    categories=categories,
-                    language=language,
-                )
-
-                if not top_articles:
-                    print(f"No articles for user {line_user_id[:8]}...")
-                    continue
+                    if history is not None:
+                        history.add_articles(top_articles)
 
-                # DBに記事を保存
-                await _save_articles_to_db(top_articles)
+                    summary["delivered"] += 1
+                    print(f"Delivered to {line_user_id[:8]}...: {len(top_articles)} articles")
 
-                # Flex Message送信
-                flex_content = create_news_carousel(top_articles)
-                await send_flex_message(
-                    line_user_id,
-                    f"本日のAIニュース TOP{len(top_articles)}",
-                    flex_content,
-                )
+                except Exception as e:
+                    summary["errors"] += 1
+                    print(f"Delivery error for {line_user_id[:8]}...: {e}")
+                    continue
 
-                print(f"Delivered to {line_user_id[:8]}...: {len(top_articles)} articles")
+            await save_histories(histories)
 
-            except Exception as e:
-                print(f"Delivery error for {line_user_id[:8]}...: {e}")
-                continue
+        if not total_users:
+            print(f"No users scheduled for {current_hour}:00")
+            return
 
         print(f"Hourly delivery complete for {current_hour}:00")
 
     except Exception as e:
+        result = "error"
         print(f"Hourly delivery error: {e}")
         raise
 
-
-async def send_daily_news_to_user(user_id: str):
-    """特定ユーザーにニュースを送信（ユーザー設定に基づく）"""
-    from app.services.social_scorer import get_top_articles
-    from app.services.line_service import send_flex_message, get_user_settings
+    finally:
+        summary["duration_seconds"] = round(time.perf_counter() - started, 3)
+        summary["timestamp"] = time.time()
+        for field, value in summary.items():
+            DELIVERY_LAST_RUN.set(value, field=field)
+        DELIVERY_RUNS.inc(result=result)
+        print(f"Hourly delivery summary ({current_hour}:00): {summary}")
+
+
+async def article_retention():
+    """保持期間を過ぎた記事・配信履歴の削除、ソーシャル指標の時系列の間引き、webhookイベントIDの削除ジョブ"""
+    from app.services.article_retention import downsample_social_samples, purge_old_articles
+    from app.services.delivery_history import purge_stale_histories
+    from app.services.event_dedup import purge_expired_webhook_events
+
+    steps = [purge_old_articles, downsample_social_samples, purge_stale_histories]
+    if settings.webhook_dedup_backend == "db":
+        steps.append(purge_expired_webhook_events)
+
+    # 1つの処理が失敗しても残りの処理は行う
+    for step in steps:
+        try:
+            await step()
+        except Exception as e:
+            print(f"Article retention error ({step.__name__}): {e}")
+
+
+async def _iter_recipient_batches(hour: int):
+    """配信対象ユーザーをバッチ単位で取得
+
+    単一ワーカーではインメモリのインデックスから取得する（構築前はDBから取得）。
+    リーダー選出時は設定変更を他のワーカーが受けている可能性があるため、
+    この時間の配信対象だけをDBから取得する。
+    """
+    from app.services.line_service import get_users_by_delivery_hour
+    from app.services.recipient_index import recipient_index
+
+    if recipient_index.loaded and not settings.scheduler_leader_election:
+        users = recipient_index.get_recipients(hour)
+        batch_size = settings.recipient_batch_size
+        for i in range(0, len(users), batch_size):
+            yield users[i:i + batch_size]
+    else:
+        async for users in get_users_by_delivery_hour(hour):
+            yield users
+
+
+@profiled("send_daily_news_to_user")
+async def send_daily_news_to_user(user_id: str, reply: Optional["EventReply"] = None):
+    """特定ユーザーにニュースを送信（ユーザー設定に基づく）
+
+    記事は直近のスナップショットから選ぶため、収集・スコアリングを待たずに応答できる。
+    reply（webhookイベントの応答）を渡すとreplyTokenで送信する。
+    """
+    from app.services.news_snapshot import get_cached_top_articles
+    from app.services.line_service import EventReply, get_user_settings
+    from app.services.delivery_history import load_histories, save_histories
+
+    # replyTokenがなければpushで送る
+    reply = reply or EventReply(user_id)
 
     try:
         # ユーザー設定を取得
@@ -133,86 +284,106 @@ async def send_daily_news_to_user(user_id: str):
             categories = user_settings.get_categories()
             language = user_settings.language
 
-        # ユーザー設定に基づいて記事取得
-        top_articles = await get_top_articles(
+        # 配信済みの記事を除いて、ユーザー設定に基づいて記事取得
+        histories = {}
+        if settings.delivery_history_enabled:
+            histories = await load_histories([user_id])
+        top_articles = await get_cached_top_articles(
             count=settings.max_articles_per_delivery,
             categories=categories,
             language=language,
+            seen=histories.get(user_id),
         )
 
         if not top_articles:
-            from app.services.line_service import send_text_message
-            await send_text_message(user_id, "現在配信できるニュースがありません。\n設定を変更すると、より多くの記事が表示される場合があります。")
+            reply.text("現在配信できるニュースがありません。\n設定を変更すると、より多くの記事が表示される場合があります。")
+            await reply.send()
             return
 
         # DBに記事を保存
         await _save_articles_to_db(top_articles)
 
         # Flex Message送信
-        flex_content = create_news_carousel(top_articles)
-        await send_flex_message(
-            user_id,
-            f"AIニュース TOP{len(top_articles)}",
-            flex_content,
-        )
+        with PIPELINE_STAGE_SECONDS.time(stage="render"):
+            flex_content = create_news_carousel(top_articles)
+        reply.flex(f"AIニュース TOP{len(top_articles)}", flex_content)
+        await reply.send()
+
+        if user_id in histories:
+            histories[user_id].add_articles(top_articles)
+            await save_histories(histories)
 
     except Exception as e:
         print(f"Send news error: {e}")
-        from app.services.line_service import send_text_message
-        await send_text_message(user_id, "ニュースの取得に失敗しました。しばらく後にお試しください。")
+        reply.messages.clear()
+        reply.text("ニュースの取得に失敗しました。しばらく後にお試しください。")
+        await reply.send()
 
 
 async def _save_articles_to_db(articles):
-    """記事をDBに保存（お気に入り用）"""
+    """記事をDBに保存（お気に入り用）
+
+    同じ記事を同時に保存する処理（同じスナップショットからの配信）と競合した場合は、
+    既存行の更新として1回だけやり直す。
+    """
     from sqlalchemy import select
+    from sqlalchemy.exc import IntegrityError
 
     print(f"[_save_articles_to_db] Saving {len(articles)} articles to DB...")
 
-    try:
-        async with async_session() as session:
-            saved_count = 0
-            updated_count = 0
-
-            for article in articles:
-                article_id = _generate_article_id(article.url)
-                print(f"[_save_articles_to_db] Processing: {article_id} - {article.title[:30]}...")
-
-                # 既存チェック
-                result = await session.execute(
-                    select(Article).where(Article.id == article_id)
-                )
-                existing = result.scalar_one_or_none()
-
-                if existing:
-                    # スコア更新
-                    existing.popularity_score = article.popularity_score
-                    existing.hatena_count = article.hatena_count
-                    existing.hackernews_score = article.hackernews_score
-                    updated_count += 1
-                else:
-                    # 新規作成
-                    new_article = Article(
-                        id=article_id,
-                        url=article.url,
-                        title=article.title,
-                        summary=article.summary,
-                        source=article.source,
-                        thumbnail_url=article.thumbnail_url,
-                        popularity_score=article.popularity_score,
-                        hatena_count=article.hatena_count,
-                        hackernews_score=article.hackernews_score,
-                        reddit_score=article.reddit_score,
-                        source_count=article.source_count,
-                        published_at=article.published_at,
-                    )
-                    session.add(new_article)
-                    saved_count += 1
+    for attempt in range(2):
+        try:
+            async with async_session() as session:
+                saved_count = 0
+                updated_count = 0
 
-            await session.commit()
-            print(f"[_save_articles_to_db] Complete: {saved_count} new, {updated_count} updated")
+                for article in articles:
+                    article_id = _generate_article_id(article.url)
+                    print(f"[_save_articles_to_db] Processing: {article_id} - {article.title[:30]}...")
 
-    except Exception as e:
-        print(f"[_save_articles_to_db] ERROR: {e}")
-        import traceback
-        traceback.print_exc()
-        raise
+                    # 既存チェック
+                    result = await session.execute(
+                        select(Article).where(Article.id == article_id)
+                    )
+                    existing = result.scalar_one_or_none()
+
+                    if existing:
+                        # スコア更新
+                        existing.popularity_score = article.popularity_score
+                        existing.hatena_count = article.hatena_count
+                        existing.hackernews_score = article.hackernews_score
+                        updated_count += 1
+                    else:
+                        # 新規作成
+                        new_article = Article(
+                            id=article_id,
+                            url=article.url,
+                            title=article.title,
+                            summary=article.summary,
+                            source=article.source,
+                            thumbnail_url=article.thumbnail_url,
+                            popularity_score=article.popularity_score,
+                            hatena_count=article.hatena_count,
+                            hackernews_score=article.hackernews_score,
+                            reddit_score=article.reddit_score,
+                            source_count=article.source_count,
+                            published_at=article.published_at,
+                        )
+                        session.add(new_article)
+                        saved_count += 1
+
+                await session.commit()
+                print(f"[_save_articles_to_db] Complete: {saved_count} new, {updated_count} updated")
+                return
+
+        except IntegrityError as e:
+            if attempt:
+                print(f"[_save_articles_to_db] ERROR: {e}")
+                raise
+            print("[_save_articles_to_db] Conflict with a concurrent save, retrying as update")
+
+        except Exception as e:
+            print(f"[_save_articles_to_db] ERROR: {e}")
+            import traceback
+            traceback.print_exc()
+            raise
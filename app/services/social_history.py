@@ -0,0 +1,118 @@
+"""記事のソーシャル指標の時系列（トレンドスコア用）
+
+スコアリングで取得したはてブ数 / HNスコアを article_social_samples に追記する。
+取得済みの値を記録するだけなので、外部APIの呼び出しは増えない。
+ソースが落ちていて前回の値（または0）で代用した記事は記録しない（増加速度が歪むため）。
+同じ記事は social_sample_interval_minutes 以内に再記録しない（ユーザーごとの
+記事取得で同じ値が何度も書かれるのを防ぐ）。
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple, TYPE_CHECKING
+
+from sqlalchemy import and_, func, insert, select
+
+from app.config import settings
+from app.models import ArticleSocialSample, async_session
+from app.utils.flex_message import _generate_article_id
+from app.utils.metrics import SOCIAL_SAMPLES
+
+if TYPE_CHECKING:
+    from app.services.article_record import ArticleRecord
+
+# article_id -> 最後に記録した時刻（プロセス内の間引き用）
+_last_sampled: Dict[str, datetime] = {}
+
+
+async def record_social_samples(articles: List["ArticleRecord"]) -> int:
+    """スコアリング済み記事の指標を時系列に追記
+
+    Returns:
+        int: 記録したサンプル数
+    """
+    now = datetime.utcnow()
+    min_interval = timedelta(minutes=settings.social_sample_interval_minutes)
+
+    rows = []
+    stale_count = 0
+    for article in articles:
+        if article.social_stale:
+            stale_count += 1
+            continue
+        article_id = _generate_article_id(article.url)
+        last = _last_sampled.get(article_id)
+        if last and now - last < min_interval:
+            continue
+        rows.append({
+            "article_id": article_id,
+            "ts": now,
+            "hatena": article.hatena_count,
+            "hn": article.hackernews_score,
+        })
+
+    if stale_count:
+        SOCIAL_SAMPLES.inc(stale_count, op="skipped_stale")
+    if not rows:
+        return 0
+
+    try:
+        async with async_session() as session:
+            await session.execute(insert(ArticleSocialSample), rows)
+            await session.commit()
+    except Exception as e:
+        print(f"[record_social_samples] ERROR: {e}")
+        return 0
+
+    for row in rows:
+        _last_sampled[row["article_id"]] = now
+    # 時間窓を過ぎたエントリは間引き判定に不要
+    if len(_last_sampled) > len(rows) * 4:
+        for article_id in [k for k, ts in _last_sampled.items() if now - ts >= min_interval]:
+            del _last_sampled[article_id]
+
+    SOCIAL_SAMPLES.inc(len(rows), op="written")
+    return len(rows)
+
+
+async def load_trending_baselines(
+    articles: List["ArticleRecord"],
+    window_hours: float,
+) -> Dict[str, Tuple[datetime, int, int]]:
+    """各記事の時間窓内で最も古いサンプル
+
+    Returns:
+        Dict[str, Tuple[datetime, int, int]]: URL -> (ts, hatena, hn)
+    """
+    ids_by_url = {article.url: _generate_article_id(article.url) for article in articles}
+    if not ids_by_url:
+        return {}
+
+    since = datetime.utcnow() - timedelta(hours=window_hours)
+    earliest = (
+        select(ArticleSocialSample.article_id, func.min(ArticleSocialSample.ts).label("ts"))
+        .where(ArticleSocialSample.article_id.in_(set(ids_by_url.values())))
+        .where(ArticleSocialSample.ts >= since)
+        .group_by(ArticleSocialSample.article_id)
+        .subquery()
+    )
+    query = select(
+        ArticleSocialSample.article_id,
+        ArticleSocialSample.ts,
+        ArticleSocialSample.hatena,
+        ArticleSocialSample.hn,
+    ).join(
+        earliest,
+        and_(
+            ArticleSocialSample.article_id == earliest.c.article_id,
+            ArticleSocialSample.ts == earliest.c.ts,
+        ),
+    )
+
+    try:
+        async with async_session() as session:
+            result = await session.execute(query)
+            samples = {row.article_id: (row.ts, row.hatena, row.hn) for row in result}
+    except Exception as e:
+        print(f"[load_trending_baselines] ERROR: {e}")
+        return {}
+
+    return {url: samples[article_id] for url, article_id in ids_by_url.items() if article_id in samples}
@@ -1,26 +1,18 @@
 import re
 import asyncio
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from typing import Container, Dict, List, Optional, Tuple, TYPE_CHECKING
 
 import httpx
 
-from app.services.news_collector import CollectedArticle, CATEGORY_KEYWORDS
+from app.services.article_record import ArticleRecord, records_nbytes
+from app.services.news_collector import CATEGORY_KEYWORDS
+from app.utils.circuit_breaker import CircuitOpenError, get_circuit_breaker, raise_for_unavailable
+from app.utils.metrics import InstrumentedTransport, PIPELINE_ARTICLE_BYTES, PIPELINE_STAGE_SECONDS
+from app.utils.singleflight import SingleFlight
+from app.utils.tracing import span
 
-
-@dataclass
-class ScoredArticle:
-    url: str
-    title: str
-    summary: str
-    source: str
-    thumbnail_url: str
-    published_at: any
-    hatena_count: int
-    hackernews_score: int
-    reddit_score: int
-    source_count: int
-    popularity_score: int
+if TYPE_CHECKING:
+    from app.services.news_snapshot import NewsSnapshot
 
 
 # スコアリングの重み
@@ -31,85 +23,94 @@ WEIGHTS = {
     "source_count": 10.0 # 複数ソース掲載ボーナス
 }
 
+# ソーシャル指標のAPI（ホスト名をサーキットブレーカー名に使う）
+HATENA_HOST = "bookmark.hatenaapis.com"
+HN_SEARCH_HOST = "hn.algolia.com"
+
 
 class SocialScorer:
     def __init__(self):
-        self.client = httpx.AsyncClient(timeout=15.0)
+        self.client = httpx.AsyncClient(timeout=15.0, transport=InstrumentedTransport())
+        # 最後に成功した結果で代わりに応答したソース（ブレーカー名）
+        self.stale_sources = set()
 
     async def close(self):
         await self.client.aclose()
 
-    async def score_articles(self, articles: List[CollectedArticle]) -> List[ScoredArticle]:
-        """記事リストにスコアを付与"""
+    async def score_articles(self, articles: List[ArticleRecord]) -> List[ArticleRecord]:
+        """記事にソーシャル指標を書き込む（重み付けと並び替えは RankingEngine で一括計算）
+
+        記事はコピーせずそのまま更新し、スコアリングに失敗した記事を除いて返す。
+        """
         tasks = [self._score_single(article) for article in articles]
         scored = await asyncio.gather(*tasks, return_exceptions=True)
 
-        results = []
-        for item in scored:
-            if isinstance(item, ScoredArticle):
-                results.append(item)
-
-        # スコア順にソート
-        results.sort(key=lambda x: x.popularity_score, reverse=True)
-        return results
+        return [article for article, result in zip(articles, scored) if not isinstance(result, BaseException)]
 
-    async def _score_single(self, article: CollectedArticle) -> ScoredArticle:
+    async def _score_single(self, article: ArticleRecord) -> None:
         """単一記事のスコアリング"""
-        hatena_count = await self._get_hatena_count(article.url)
-        hn_score = await self._get_hackernews_score(article.url)
-        reddit_score = 0  # Reddit APIは認証が複雑なため初期実装では省略
-
-        # ソース数（同じURLが複数ソースで取り上げられている場合）
-        source_count = 1
-
-        # 総合スコア計算
-        popularity_score = int(
-            hatena_count * WEIGHTS["hatena"] +
-            hn_score * WEIGHTS["hackernews"] +
-            reddit_score * WEIGHTS["reddit"] +
-            (source_count - 1) * WEIGHTS["source_count"]
-        )
-
-        return ScoredArticle(
-            url=article.url,
-            title=article.title,
-            summary=article.summary,
-            source=article.source,
-            thumbnail_url=article.thumbnail_url or "",
-            published_at=article.published_at,
-            hatena_count=hatena_count,
-            hackernews_score=hn_score,
-            reddit_score=reddit_score,
-            source_count=source_count,
-            popularity_score=popularity_score,
-        )
-
-    async def _get_hatena_count(self, url: str) -> int:
-        """はてなブックマーク数を取得"""
+        article.hatena_count, hatena_stale = await self._get_hatena_count(article.url)
+        article.hackernews_score, hackernews_stale = await self._get_hackernews_score(article.url)
+        article.reddit_score = 0  # Reddit APIは認証が複雑なため初期実装では省略
+        # 取得できなかった指標は時系列に記録しない
+        article.social_stale = hatena_stale or hackernews_stale
+
+    async def _call_source(self, host: str, url: str, fetch) -> Tuple[int, bool]:
+        """ホストのサーキットブレーカー経由で指標を取得
+
+        Returns:
+            Tuple[int, bool]: (値, 今回取得できなかったか)。落ちている間は最後に取得できた値、
+            それもなければ0
+        """
         try:
-            api_url = f"https://bookmark.hatenaapis.com/count/entry?url={url}"
-            response = await self.client.get(api_url)
+            result = await get_circuit_breaker(host).call(url, fetch)
+        except Exception:
+            self.stale_sources.add(host)
+            raise
+        if result.stale:
+            self.stale_sources.add(host)
+        return result.value, result.stale
+
+    async def _get_hatena_count(self, url: str) -> Tuple[int, bool]:
+        """はてなブックマーク数を取得（値, 今回取得できなかったか）"""
+        async def fetch() -> int:
+            response = await self.client.get(f"https://{HATENA_HOST}/count/entry?url={url}")
+            raise_for_unavailable(response)
             if response.status_code == 200:
-                return int(response.text)
+                return int(response.text or 0)
+            return 0
+
+        try:
+            return await self._call_source(HATENA_HOST, url, fetch)
+        except CircuitOpenError:
+            pass
         except Exception as e:
             print(f"はてブAPI エラー: {e}")
-        return 0
+        return 0, True
 
-    async def _get_hackernews_score(self, url: str) -> int:
-        """Hacker Newsでの該当記事スコアを取得"""
-        try:
+    async def _get_hackernews_score(self, url: str) -> Tuple[int, bool]:
+        """Hacker Newsでの該当記事スコアを取得（値, 今回取得できなかったか）"""
+        async def fetch() -> int:
             # Algolia HN Search API
-            api_url = f"https://hn.algolia.com/api/v1/search?query={url}&restrictSearchableAttributes=url"
-            response = await self.client.get(api_url)
+            response = await self.client.get(
+                f"https://{HN_SEARCH_HOST}/api/v1/search?query={url}&restrictSearchableAttributes=url"
+            )
+            raise_for_unavailable(response)
             if response.status_code == 200:
                 data = response.json()
                 hits = data.get("hits", [])
                 if hits:
                     # 最もスコアの高いものを返す
                     return max(hit.get("points", 0) for hit in hits)
+            return 0
+
+        try:
+            return await self._call_source(HN_SEARCH_HOST, url, fetch)
+        except CircuitOpenError:
+            pass
         except Exception as e:
             print(f"HN Search API エラー: {e}")
-        return 0
+        return 0, True
 
 
 def detect_language(text: str) -> str:
@@ -135,10 +136,10 @@ def match_category(text: str, categories: List[str]) -> bool:
 
 
 def filter_articles(
-    articles: List[ScoredArticle],
+    articles: List[ArticleRecord],
     categories: Optional[List[str]] = None,
     language: str = "both"
-) -> List[ScoredArticle]:
+) -> List[ArticleRecord]:
     """記事をカテゴリと言語でフィルタリング"""
     filtered = []
 
@@ -160,35 +161,85 @@ def filter_articles(
     return filtered
 
 
-async def get_top_articles(
-    count: int = 5,
-    categories: Optional[List[str]] = None,
-    language: str = "both"
-) -> List[ScoredArticle]:
-    """人気記事Top Nを取得（フィルタリング対応）"""
+# 収集・スコアリングの同時実行を1回にまとめる
+news_snapshot_flight = SingleFlight("news_snapshot")
+
+
+async def build_news_snapshot() -> "NewsSnapshot":
+    """全ソースの記事を収集・スコアリングしてスナップショットを作成（最新として保持する）
+
+    実行中の収集・スコアリングがあれば新しく始めず、その結果を待って受け取る。
+    """
+    return await news_snapshot_flight.do("all", _build_news_snapshot)
+
+
+async def _build_news_snapshot() -> "NewsSnapshot":
     from app.services.news_collector import NewsCollector
+    from app.services.news_snapshot import NewsSnapshot, news_snapshot_cache
+    from app.services.social_history import load_trending_baselines, record_social_samples
     from app.config import settings
 
     collector = NewsCollector()
     scorer = SocialScorer()
 
     try:
-        # 記事収集
-        articles = await collector.collect_all(hours=settings.article_fetch_hours)
-        print(f"収集記事数: {len(articles)}")
-
-        # スコアリング
-        scored_articles = await scorer.score_articles(articles)
-        print(f"スコアリング完了: {len(scored_articles)}件")
-
-        # フィルタリング（カテゴリ/言語）
-        if categories or language != "both":
-            scored_articles = filter_articles(scored_articles, categories, language)
-            print(f"フィルタリング後: {len(scored_articles)}件 (categories={categories}, language={language})")
-
-        # Top N返却
-        return scored_articles[:count]
+        with span("build_news_snapshot"):
+            # 記事収集
+            with PIPELINE_STAGE_SECONDS.time(stage="collect"):
+                articles = await collector.collect_all(hours=settings.article_fetch_hours)
+            print(f"収集記事数: {len(articles)}")
+
+            # スコアリング
+            with PIPELINE_STAGE_SECONDS.time(stage="score"):
+                scored_articles = await scorer.score_articles(articles)
+            # 今回のサイクルで保持している記事レコードのメモリ
+            cycle_bytes = records_nbytes(scored_articles)
+            PIPELINE_ARTICLE_BYTES.set(cycle_bytes)
+            print(f"スコアリング完了: {len(scored_articles)}件 (記事レコード {cycle_bytes / 1024:.0f}KiB)")
+
+            # トレンドモードでは時間窓内の基準点を読み、今回の指標を時系列に記録
+            baselines = None
+            with PIPELINE_STAGE_SECONDS.time(stage="history"):
+                if settings.ranking_mode == "trending":
+                    baselines = await load_trending_baselines(scored_articles, settings.trending_window_hours)
+                await record_social_samples(scored_articles)
+
+            # ランキングエンジンの構築（重み付け・時間減衰・カテゴリ/言語の判定）
+            # 落ちていたソースは最後に取得できた結果で代用している
+            stale_sources = collector.stale_sources | scorer.stale_sources
+            if stale_sources:
+                print(f"停止中のソース（前回の結果を使用）: {sorted(stale_sources)}")
+
+            with PIPELINE_STAGE_SECONDS.time(stage="rank"):
+                snapshot = NewsSnapshot(scored_articles, baselines=baselines, stale_sources=stale_sources)
+
+        news_snapshot_cache.store(snapshot)
+        return snapshot
 
     finally:
         await collector.close()
         await scorer.close()
+
+
+async def get_top_articles(
+    count: int = 5,
+    categories: Optional[List[str]] = None,
+    language: str = "both",
+    seen: Optional[Container[str]] = None,
+) -> List[ArticleRecord]:
+    """人気記事Top Nを取得（フィルタリング対応）
+
+    毎回最新の記事を収集・スコアリングする（結果はオンデマンド要求用のスナップショットにもなる）。
+    同時に呼ばれた場合は1回の収集・スコアリングの結果を共有する。
+    seen（配信済みの article_id）を渡すと、含まれる記事を飛ばして下位の記事で補充する。
+    ソースが落ちていて前回の値で代用した指標を持つ記事は social_stale が True になる。
+    """
+    with span("get_top_articles", count=count, language=language):
+        snapshot = await build_news_snapshot()
+        top_articles = snapshot.top(count, categories, language, seen=seen)
+    stale_count = sum(1 for article in top_articles if article.social_stale)
+    print(
+        f"ランキング完了: {len(top_articles)}件 (categories={categories}, language={language}, "
+        f"stale={stale_count}件)"
+    )
+    return top_articles
@@ -0,0 +1,170 @@
+"""外部ソースごとのサーキットブレーカー（最後に成功した結果へのフォールバック付き）
+
+外部ホスト・フィードごとに連続失敗を数え、落ちているソースへの呼び出しを止める。
+  - closed    : 通常どおり呼び出す。連続 failure_threshold 回失敗したら open
+  - open      : 呼び出さずに直ちに返す。一定時間（CIRCUIT_BREAKER_RESET_SECONDS）経過後に half-open
+  - half-open : 1件だけ試しに呼び出し、成功すれば closed、失敗すれば再び open
+                （次に試すまでの時間は倍にする。上限 CIRCUIT_BREAKER_MAX_RESET_SECONDS）
+
+呼び出さなかった・失敗した場合は、同じキーで最後に成功した結果を stale=True として返す
+（まだ成功した結果がなければ例外）。
+
+    breaker = get_circuit_breaker("bookmark.hatenaapis.com")
+    result = await breaker.call(url, fetch_count)
+    count, stale = result.value, result.stale
+
+メトリクス:
+  - ainews_circuit_breaker_state{name}               : 0=closed / 1=half-open / 2=open
+  - ainews_circuit_breaker_calls_total{name, result} : success / failure / rejected（openのため呼び出さず）
+  - ainews_circuit_breaker_stale_responses_total{name} : 最後に成功した結果で代わりに応答した回数
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional
+
+import httpx
+
+from app.config import settings
+from app.utils.metrics import CIRCUIT_BREAKER_CALLS, CIRCUIT_BREAKER_STALE_RESPONSES, CIRCUIT_BREAKER_STATE
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+_MISSING = object()
+
+
+class CircuitOpenError(Exception):
+    """ブレーカーが開いていて、代わりに返せる結果もない"""
+
+
+class BreakerResult(NamedTuple):
+    value: Any
+    stale: bool  # True: 呼び出さなかった・失敗したため、最後に成功した結果を返した
+
+
+def raise_for_unavailable(response: httpx.Response) -> None:
+    """ソースが応答できない状態（5xx / 429）ならブレーカーの失敗として例外にする"""
+    if response.status_code >= 500 or response.status_code == 429:
+        response.raise_for_status()
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: Optional[int] = None,
+        reset_seconds: Optional[float] = None,
+        fallback_size: Optional[int] = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.circuit_breaker_failure_threshold
+        self.reset_seconds = reset_seconds or settings.circuit_breaker_reset_seconds
+        self.fallback_size = fallback_size or settings.circuit_breaker_fallback_size
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.open_seconds = self.reset_seconds
+        self._probing = False
+        self._last_good: "OrderedDict[Hashable, Any]" = OrderedDict()
+        CIRCUIT_BREAKER_STATE.set(_STATE_VALUES[CLOSED], name=name)
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            print(f"[CircuitBreaker] {self.name}: {self.state} -> {state}")
+            self.state = state
+        CIRCUIT_BREAKER_STATE.set(_STATE_VALUES[state], name=self.name)
+
+    def _open(self) -> None:
+        self.opened_at = time.monotonic()
+        self._set_state(OPEN)
+
+    def _allow(self) -> bool:
+        """今呼び出してよいか（half-openでは試行中の1件だけを許可）"""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                return False
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def _record_success(self) -> None:
+        self.failures = 0
+        self.open_seconds = self.reset_seconds
+        self._set_state(CLOSED)
+
+    def _record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            # 試行に失敗したら次に試すまでの時間を延ばす
+            self.open_seconds = min(self.open_seconds * 2, settings.circuit_breaker_max_reset_seconds)
+            self._open()
+        elif self.state == CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def _remember(self, key: Hashable, value: Any) -> None:
+        self._last_good[key] = value
+        self._last_good.move_to_end(key)
+        while len(self._last_good) > self.fallback_size:
+            self._last_good.popitem(last=False)
+
+    def _fallback(self, key: Hashable) -> Optional[BreakerResult]:
+        value = self._last_good.get(key, _MISSING)
+        if value is _MISSING:
+            return None
+        CIRCUIT_BREAKER_STALE_RESPONSES.inc(name=self.name)
+        return BreakerResult(value, True)
+
+    async def call(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> BreakerResult:
+        """func を呼び出す（openの間・失敗時は key で最後に成功した結果を返す）
+
+        Raises:
+            CircuitOpenError: openで、key の成功した結果がない
+            Exception: func が失敗し、key の成功した結果がない（func の例外）
+        """
+        if not self._allow():
+            CIRCUIT_BREAKER_CALLS.inc(name=self.name, result="rejected")
+            fallback = self._fallback(key)
+            if fallback is None:
+                raise CircuitOpenError(f"circuit open: {self.name}")
+            return fallback
+
+        probe = self.state == HALF_OPEN
+        try:
+            value = await func()
+        except Exception:
+            CIRCUIT_BREAKER_CALLS.inc(name=self.name, result="failure")
+            self._record_failure()
+            fallback = self._fallback(key)
+            if fallback is None:
+                raise
+            return fallback
+        finally:
+            if probe:
+                self._probing = False
+
+        CIRCUIT_BREAKER_CALLS.inc(name=self.name, result="success")
+        self._record_success()
+        self._remember(key, value)
+        return BreakerResult(value, False)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(name: str, **options) -> CircuitBreaker:
+    """名前ごとのブレーカーを取得（初回のみ options で作成）"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name, **options)
+    return breaker
+
+
+def get_circuit_breaker_states() -> Dict[str, str]:
+    """全ブレーカーの状態（ヘルスチェック用）"""
+    return {name: breaker.state for name, breaker in _breakers.items()}
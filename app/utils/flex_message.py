@@ -1,12 +1,12 @@
-from typing import List, TYPE_CHECKING
+from typing import List, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from app.services.social_scorer import ScoredArticle
+    from app.services.article_record import ArticleRecord
     from app.models.article import Article
     from app.models.user_settings import UserSettings
 
 
-def create_news_carousel(articles: List["ScoredArticle"]) -> dict:
+def create_news_carousel(articles: List["ArticleRecord"]) -> dict:
     """ニュース配信用カルーセルFlex Message"""
     bubbles = []
 
@@ -118,8 +118,8 @@ def create_news_carousel(articles: List["ScoredArticle"]) -> dict:
     }
 
 
-def create_favorites_list(articles: List["Article"]) -> dict:
-    """お気に入り一覧Flex Message"""
+def create_favorites_list(articles: List["Article"], next_cursor: Optional[str] = None) -> dict:
+    """お気に入り一覧Flex Message（next_cursorがあれば「次へ」バブルを追加）"""
     if not articles:
         return {
             "type": "bubble",
@@ -197,6 +197,30 @@ def create_favorites_list(articles: List["Article"]) -> dict:
         }
         bubbles.append(bubble)
 
+    if next_cursor:
+        bubbles.append({
+            "type": "bubble",
+            "size": "kilo",
+            "body": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {
+                        "type": "button",
+                        "action": {
+                            "type": "postback",
+                            "label": "次のお気に入り",
+                            "data": f"action=show_favorites&cursor={next_cursor}",
+                        },
+                        "style": "secondary",
+                        "height": "sm",
+                    }
+                ],
+                "justifyContent": "center",
+                "paddingAll": "12px",
+            },
+        })
+
     return {
         "type": "carousel",
         "contents": bubbles,
@@ -0,0 +1,70 @@
+"""JSONのエンコード/デコード
+
+orjson（任意依存、requirements.txt には含めない）がインストールされていれば使い、
+なければ標準ライブラリの json で代替する。
+設定 JSON_CODEC で明示的に選ぶこともできる（"auto" / "orjson" / "json"）。
+webhookの受信ボディ、ユーザー設定のカテゴリで使う。
+
+    from app.utils import json_codec
+    events = json_codec.loads(body).get("events", [])
+    raw = json_codec.dumps(categories)
+"""
+import json
+from typing import Any, Union
+
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjsonは任意依存
+    orjson = None
+
+# デコード失敗時の例外（orjson.JSONDecodeError もこのサブクラス）
+JSONDecodeError = json.JSONDecodeError
+
+
+class _StdlibCodec:
+    name = "json"
+
+    @staticmethod
+    def loads(data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+    @staticmethod
+    def dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+    @staticmethod
+    def dumps_bytes(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class _OrjsonCodec:
+    name = "orjson"
+
+    @staticmethod
+    def loads(data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+    @staticmethod
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    @staticmethod
+    def dumps_bytes(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+
+def _select_codec(name: str):
+    if name == "json":
+        return _StdlibCodec
+    if name == "orjson" and orjson is None:
+        print("[json_codec] orjson is not installed, falling back to json")
+    return _OrjsonCodec if orjson is not None else _StdlibCodec
+
+
+codec = _select_codec(settings.json_codec)
+
+loads = codec.loads
+dumps = codec.dumps
+dumps_bytes = codec.dumps_bytes
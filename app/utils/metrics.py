@@ -0,0 +1,314 @@
+"""Prometheus形式のメトリクス（外部依存なしの最小実装）
+
+Counter / Gauge / Histogram をモジュールレベルで定義し、/metrics でテキスト形式
+（exposition format 0.0.4）として出力する。ラベルはキーワード引数で渡す。
+
+    PIPELINE_STAGE_SECONDS.observe(0.12, stage="collect")
+    with PIPELINE_STAGE_SECONDS.time(stage="score"):
+        ...
+"""
+import time
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """exposition format のサンプル行"""
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # [bucket counts..., sum, count]
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        lines = []
+        for key, state in items:
+            for bound, count in zip(self.buckets, state):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(count)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(state[-1])}")
+        return lines
+
+
+def render() -> str:
+    """全メトリクスをテキスト形式で出力"""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """外部HTTPリクエストをホスト/ステータス別に数えるhttpxトランスポート"""
+
+    def __init__(self, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        from app.utils.tracing import span
+
+        host = request.url.host
+        started = time.perf_counter()
+        with span(f"HTTP {request.method}", host=host, path=request.url.path) as current:
+            try:
+                response = await self.inner.handle_async_request(request)
+            except Exception as e:
+                OUTBOUND_REQUESTS.inc(host=host, status=type(e).__name__)
+                raise
+            finally:
+                OUTBOUND_REQUEST_SECONDS.observe(time.perf_counter() - started, host=host)
+            if current:
+                current.set_attribute("status", response.status_code)
+        OUTBOUND_REQUESTS.inc(host=host, status=str(response.status_code))
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+# ==================== メトリクス定義 ====================
+
+PIPELINE_STAGE_SECONDS = Histogram(
+    "ainews_pipeline_stage_seconds",
+    "Latency of news pipeline stages (collect, score, history, rank, render, push, reply)",
+    ("stage",),
+)
+
+PIPELINE_ARTICLE_BYTES = Gauge(
+    "ainews_pipeline_article_bytes",
+    "Approximate memory held by article records in the last collect+score cycle",
+)
+
+NEWS_SNAPSHOT_REQUESTS = Counter(
+    "ainews_news_snapshot_requests_total",
+    "On-demand top-article requests served from the scored snapshot, by freshness (fresh, stale, miss)",
+    ("result",),
+)
+
+NEWS_SNAPSHOT_STALE_SOURCES = Gauge(
+    "ainews_news_snapshot_stale_sources",
+    "Sources served from their last good result in the current news snapshot (1=stale, 0=fresh)",
+    ("source",),
+)
+
+SINGLEFLIGHT_CALLS = Counter(
+    "ainews_singleflight_calls_total",
+    "Calls into a single-flight section, by whether they started the work (leader) or joined it (waiter)",
+    ("name", "role"),
+)
+
+SINGLEFLIGHT_WAITERS = Gauge(
+    "ainews_singleflight_waiters",
+    "Callers currently waiting on an in-flight computation",
+    ("name",),
+)
+
+SINGLEFLIGHT_COALESCED_SECONDS = Counter(
+    "ainews_singleflight_coalesced_seconds_total",
+    "Computation time saved by coalescing (flight duration x waiters)",
+    ("name",),
+)
+
+CIRCUIT_BREAKER_STATE = Gauge(
+    "ainews_circuit_breaker_state",
+    "Circuit breaker state per external host or feed (0=closed, 1=half-open, 2=open)",
+    ("name",),
+)
+
+CIRCUIT_BREAKER_CALLS = Counter(
+    "ainews_circuit_breaker_calls_total",
+    "Calls through a circuit breaker by result (success, failure, rejected while open)",
+    ("name", "result"),
+)
+
+CIRCUIT_BREAKER_STALE_RESPONSES = Counter(
+    "ainews_circuit_breaker_stale_responses_total",
+    "Calls answered with the last good result because the source was open or failing",
+    ("name",),
+)
+
+OUTBOUND_REQUESTS = Counter(
+    "ainews_outbound_requests_total",
+    "Outbound HTTP requests by host and status (exception name on transport errors)",
+    ("host", "status"),
+)
+
+OUTBOUND_REQUEST_SECONDS = Histogram(
+    "ainews_outbound_request_seconds",
+    "Outbound HTTP request latency by host",
+    ("host",),
+)
+
+DB_POOL_CHECKOUT_WAIT_SECONDS = Histogram(
+    "ainews_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the DB pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+
+WEBHOOK_EVENT_SECONDS = Histogram(
+    "ainews_webhook_event_seconds",
+    "Webhook event handling latency by action",
+    ("action",),
+)
+
+WEBHOOK_DUPLICATE_EVENTS = Counter(
+    "ainews_webhook_duplicate_events_total",
+    "Redelivered webhook events dropped by webhookEventId, by the layer that caught them",
+    ("layer",),
+)
+
+LINE_REPLY_FALLBACKS = Counter(
+    "ainews_line_reply_fallbacks_total",
+    "Webhook responses sent by push instead of reply, by reason (expired, rejected)",
+    ("reason",),
+)
+
+DELIVERY_LAST_RUN = Gauge(
+    "ainews_delivery_last_run",
+    "Summary of the last hourly delivery run (users, delivered, no_articles, errors, duration_seconds, timestamp)",
+    ("field",),
+)
+
+ARTICLES_PURGED = Counter(
+    "ainews_articles_purged_total",
+    "Articles deleted by the retention job",
+)
+
+SOCIAL_SAMPLES = Counter(
+    "ainews_social_samples_total",
+    "Social count samples written, downsampled, expired or skipped because the source was stale",
+    ("op",),
+)
+
+STARTUP_PHASE_SECONDS = Gauge(
+    "ainews_startup_phase_seconds",
+    "Duration of each startup phase (import, init_db, ready, scheduler, recipient_index, warmup)",
+    ("phase",),
+)
+
+SCHEDULER_LEADER = Gauge(
+    "ainews_scheduler_leader",
+    "1 if this process currently owns the scheduler (leader election), else 0",
+)
+
+DELIVERY_RUNS = Counter(
+    "ainews_delivery_runs_total",
+    "Hourly delivery runs by result (success, error, skipped when the hour had already run)",
+    ("result",),
+)
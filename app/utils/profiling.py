@@ -0,0 +1,179 @@
+"""オンデマンドのプロファイリング（定期ジョブ / 遅いwebhookリクエスト）
+
+PROFILING_ENABLED=true または管理API（POST /admin/profiling）で有効化すると、
+@profiled を付けた関数と profile() で囲んだ区間を計測し、PROFILING_DIR に出力する:
+  - <時刻>-<名前>.folded   : サンプリング結果（collapsed stack形式、flamegraph.pl / speedscope で表示可）
+  - <時刻>-<名前>.pstats   : PROFILING_MODE=deterministic 時の cProfile 結果
+  - <時刻>-<名前>.tracemalloc / .alloc.txt : tracemallocスナップショットと上位割り当て箇所
+
+threshold_ms を指定した区間は、実行時間が閾値を超えた場合のみ出力する。
+計測はプロセス内で同時に1件まで（計測中に始まった区間はそのまま素通りする）。
+サンプリングはイベントループのスレッドを見るため、並行して動く他のタスクも含まれる。
+"""
+import os
+import sys
+import time
+import asyncio
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime
+from functools import wraps
+from typing import Optional
+
+from app.config import settings
+
+# tracemallocで保持するスタックの深さ
+TRACEMALLOC_FRAMES = 16
+ALLOC_TOP_N = 30
+
+
+class ProfilingState:
+    """実行時に切り替え可能なプロファイリング設定"""
+
+    def __init__(self):
+        self.enabled = settings.profiling_enabled
+        self.mode = settings.profiling_mode
+        self.active = False
+
+
+profiling_state = ProfilingState()
+
+
+class StackSampler:
+    """指定スレッドのスタックを一定間隔でサンプリングし、collapsed stack形式で集計"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止を通知（スレッドの終了は待たない）"""
+        self._stop.set()
+
+    def join(self) -> None:
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def write(self, path: str) -> None:
+        self.join()
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _output_prefix(name: str) -> str:
+    os.makedirs(settings.profiling_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    return os.path.join(settings.profiling_dir, f"{timestamp}-{name}")
+
+
+def _write_allocations(snapshot: tracemalloc.Snapshot, prefix: str) -> None:
+    snapshot.dump(f"{prefix}.tracemalloc")
+    with open(f"{prefix}.alloc.txt", "w", encoding="utf-8") as f:
+        for stat in snapshot.statistics("traceback")[:ALLOC_TOP_N]:
+            f.write(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+            for line in stat.traceback.format(limit=TRACEMALLOC_FRAMES):
+                f.write(f"    {line}\n")
+
+
+def _finish(
+    name: str,
+    elapsed_ms: float,
+    should_write: bool,
+    profiler: Optional[cProfile.Profile],
+    sampler: Optional[StackSampler],
+    started_tracemalloc: bool,
+) -> None:
+    """計測結果の取得と書き出し（ブロッキング処理のためイベントループ外のスレッドで実行）"""
+    try:
+        snapshot = tracemalloc.take_snapshot() if should_write else None
+    finally:
+        if started_tracemalloc:
+            tracemalloc.stop()
+
+    if not should_write:
+        if sampler:
+            sampler.join()
+        return
+
+    try:
+        prefix = _output_prefix(name)
+        if profiler:
+            profiler.dump_stats(f"{prefix}.pstats")
+        if sampler:
+            sampler.write(f"{prefix}.folded")
+        _write_allocations(snapshot, prefix)
+        print(f"[Profiling] {name}: {elapsed_ms:.0f}ms -> {prefix}.*")
+    except OSError as e:
+        print(f"[Profiling] write error ({name}): {e}")
+
+
+@asynccontextmanager
+async def profile(name: str, threshold_ms: Optional[float] = None):
+    """区間をプロファイリング（無効時・計測中は何もしない）"""
+    if not profiling_state.enabled or profiling_state.active:
+        yield
+        return
+
+    profiling_state.active = True
+    deterministic = profiling_state.mode == "deterministic"
+    profiler: Optional[cProfile.Profile] = None
+    sampler: Optional[StackSampler] = None
+    started_tracemalloc = not tracemalloc.is_tracing()
+
+    if started_tracemalloc:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    if deterministic:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        sampler = StackSampler(threading.get_ident(), settings.profiling_sample_interval_ms / 1000)
+        sampler.start()
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if profiler:
+            profiler.disable()
+        if sampler:
+            sampler.stop()
+        should_write = threshold_ms is None or elapsed_ms >= threshold_ms
+        try:
+            # スナップショット取得・ファイル出力は他のリクエストを止めないようスレッドで行う
+            await asyncio.to_thread(
+                _finish, name, elapsed_ms, should_write, profiler, sampler, started_tracemalloc
+            )
+        finally:
+            profiling_state.active = False
+
+
+def profiled(name: str):
+    """非同期関数をプロファイリング対象にするデコレーター"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            async with profile(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,65 @@
+"""同時実行される同じ処理の合流（single-flight）
+
+同じキーの処理が実行中なら新しく始めず、実行中の処理の結果（または例外）を待つ。
+処理は呼び出し元とは別のタスクで実行するため、待っている呼び出し元の1つが
+キャンセルされても、他の呼び出し元の処理は続く。
+
+    news_flight = SingleFlight("news_snapshot")
+    snapshot = await news_flight.do("all", _build_news_snapshot)
+
+メトリクス:
+  - ainews_singleflight_calls_total{name, role}   : 処理を始めた呼び出し（leader）/ 合流した呼び出し（waiter）
+  - ainews_singleflight_waiters{name}              : 現在合流して待っている呼び出し数
+  - ainews_singleflight_coalesced_seconds_total{name} : 合流で省いた処理時間（処理時間 × 合流数）
+"""
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.utils.metrics import SINGLEFLIGHT_CALLS, SINGLEFLIGHT_COALESCED_SECONDS, SINGLEFLIGHT_WAITERS
+
+
+class _Flight:
+    __slots__ = ("task", "started", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.started = time.perf_counter()
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """key の処理を実行（実行中なら合流して同じ結果を受け取る）"""
+        flight = self._flights.get(key)
+        if flight is not None:
+            SINGLEFLIGHT_CALLS.inc(name=self.name, role="waiter")
+            flight.waiters += 1
+            SINGLEFLIGHT_WAITERS.inc(name=self.name)
+            try:
+                return await asyncio.shield(flight.task)
+            finally:
+                SINGLEFLIGHT_WAITERS.dec(name=self.name)
+
+        SINGLEFLIGHT_CALLS.inc(name=self.name, role="leader")
+        flight = _Flight(asyncio.create_task(func()))
+        self._flights[key] = flight
+        flight.task.add_done_callback(lambda _: self._finish(key, flight))
+        return await asyncio.shield(flight.task)
+
+    def _finish(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            # 呼び出し元が全てキャンセルされていても例外を未処理扱いにしない
+            flight.task.exception()
+        if flight.waiters:
+            elapsed = time.perf_counter() - flight.started
+            SINGLEFLIGHT_COALESCED_SECONDS.inc(elapsed * flight.waiters, name=self.name)
@@ -0,0 +1,191 @@
+"""軽量トレーシング（webhook → 記事取得 → 外部API / DB → LINE push のレイテンシ内訳）
+
+contextvarsで現在のスパンを引き継ぐため、asyncio.gather で分岐したタスクにも
+親スパンが伝搬する。設定 TRACING_EXPORTER で出力先を選ぶ:
+  - "none"    : 無効（span() は何もしない）
+  - "console" : 終了したスパンを1行ずつprint
+  - "file"    : OTLP/JSON形式（resourceSpans）で TRACING_FILE_PATH にJSON Linesで追記
+                （書き込みはバックグラウンドのスレッドで行い、イベントループを止めない）
+
+    with span("get_top_articles", count=5):
+        ...
+"""
+import json
+import time
+import secrets
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+
+SERVICE_NAME = "ai-news-line-bot"
+
+# OTLP Status Code
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+# ファイル出力時のバッファ上限（ルートスパン終了時にも書き出しを依頼する）
+FILE_BUFFER_SIZE = 256
+# 書き出し依頼がなくてもバッファを書き出す間隔
+FILE_FLUSH_INTERVAL_SECONDS = 1.0
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_buffer: List[dict] = []
+_buffer_lock = threading.Lock()
+_write_lock = threading.Lock()
+_flush_requested = threading.Event()
+_writer: Optional[threading.Thread] = None
+
+
+class Span:
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent", "attributes",
+        "start_ns", "end_ns", "status_code", "status_message",
+    )
+
+    def __init__(self, name: str, attributes: Dict[str, Any], parent: Optional["Span"]):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.status_code = STATUS_UNSET
+        self.status_message = ""
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.status_code = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"[:200]
+
+    def to_otlp(self) -> dict:
+        data = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": self.status_code, "message": self.status_message},
+        }
+        if self.parent:
+            data["parentSpanId"] = self.parent.span_id
+        return data
+
+
+def _otlp_attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def is_enabled() -> bool:
+    return settings.tracing_exporter in ("console", "file")
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def _export(finished: Span) -> None:
+    if settings.tracing_exporter == "console":
+        attrs = " ".join(f"{k}={v}" for k, v in finished.attributes.items())
+        error = f" ERROR({finished.status_message})" if finished.status_code == STATUS_ERROR else ""
+        print(
+            f"[Trace] {finished.trace_id[:8]} {finished.name} "
+            f"{finished.duration_ms:.1f}ms {attrs}{error}".rstrip()
+        )
+        return
+
+    global _writer
+    with _buffer_lock:
+        _buffer.append(finished.to_otlp())
+        should_flush = finished.parent is None or len(_buffer) >= FILE_BUFFER_SIZE
+        if _writer is None:
+            _writer = threading.Thread(target=_write_loop, name="trace-writer", daemon=True)
+            _writer.start()
+    if should_flush:
+        _flush_requested.set()
+
+
+def _write_loop() -> None:
+    while True:
+        _flush_requested.wait(FILE_FLUSH_INTERVAL_SECONDS)
+        _flush_requested.clear()
+        flush()
+
+
+def flush() -> None:
+    """ファイル出力のバッファを書き出す（ブロッキング。イベントループからは to_thread で呼ぶ）"""
+    with _buffer_lock:
+        if not _buffer:
+            return
+        spans = list(_buffer)
+        _buffer.clear()
+
+    payload = {
+        "resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+        }]
+    }
+    try:
+        with _write_lock, open(settings.tracing_file_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"[Trace] export error: {e}")
+
+
+def start_span(name: str, **attributes) -> Optional[Span]:
+    """現在のスパンを親としてスパンを開始（現在のコンテキストには設定しない。無効時はNone）
+
+    開始と終了が別のコンテキストで行われうる区間（非同期ジェネレーター内など）に使い、
+    end_span で終了する。
+    """
+    if not is_enabled():
+        return None
+    return Span(name, attributes, _current_span.get())
+
+
+def end_span(finished: Optional[Span], error: Optional[BaseException] = None) -> None:
+    """start_span で開始したスパンを終了"""
+    if finished is None:
+        return
+    if error is not None:
+        finished.record_error(error)
+    finished.end_ns = time.time_ns()
+    _export(finished)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """スパンを開始して現在のコンテキストに設定（無効時は何もしない）"""
+    current = start_span(name, **attributes)
+    if current is None:
+        yield None
+        return
+
+    token = _current_span.set(current)
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_span.reset(token)
+        end_span(current, error)
@@ -0,0 +1,123 @@
+"""記事レコードのメモリ使用量ベンチマーク
+
+1サイクル（収集 → スコアリング）で保持する記事オブジェクトのメモリを tracemalloc で計測し、
+従来の表現（__dict__ を持つ CollectedArticle と、全フィールドをコピーした ScoredArticle の2つ）と
+ArticleRecord（__slots__、1レコードを書き換えて使い回す）を比較する。
+
+使い方:
+    python -m benchmarks.article_memory
+    python -m benchmarks.article_memory --articles 1000 --articles 100000
+"""
+import gc
+import argparse
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+DEFAULT_ARTICLE_COUNTS = [1_000, 10_000, 100_000]
+
+
+@dataclass
+class _LegacyCollectedArticle:
+    url: str
+    title: str
+    summary: str
+    source: str
+    thumbnail_url: Optional[str]
+    published_at: Optional[datetime]
+    canonical_url: Optional[str] = None
+    source_count: int = 1
+
+
+@dataclass
+class _LegacyScoredArticle:
+    url: str
+    title: str
+    summary: str
+    source: str
+    thumbnail_url: str
+    published_at: Optional[datetime]
+    hatena_count: int
+    hackernews_score: int
+    reddit_score: int
+    source_count: int
+    popularity_score: int
+
+
+def _fields(i: int, now: datetime) -> dict:
+    return {
+        "url": f"https://news.example.com/memory/{i}",
+        "title": f"Synthetic AI headline number {i}",
+        "summary": "summary text " * 20,
+        "source": "Benchmark",
+        "thumbnail_url": f"https://news.example.com/memory/{i}.png",
+        "published_at": now - timedelta(minutes=i % 1440),
+    }
+
+
+def _legacy_cycle(count: int, now: datetime) -> list:
+    collected = [_LegacyCollectedArticle(**_fields(i, now)) for i in range(count)]
+    scored = [
+        _LegacyScoredArticle(
+            url=a.url,
+            title=a.title,
+            summary=a.summary,
+            source=a.source,
+            thumbnail_url=a.thumbnail_url or "",
+            published_at=a.published_at,
+            hatena_count=i % 50,
+            hackernews_score=i % 30,
+            reddit_score=0,
+            source_count=a.source_count,
+            popularity_score=0,
+        )
+        for i, a in enumerate(collected)
+    ]
+    return [collected, scored]
+
+
+def _record_cycle(count: int, now: datetime) -> list:
+    from app.services.article_record import ArticleRecord
+
+    records = [ArticleRecord(**_fields(i, now)) for i in range(count)]
+    for i, record in enumerate(records):
+        record.hatena_count = i % 50
+        record.hackernews_score = i % 30
+    return [records]
+
+
+def _measure(build, count: int) -> int:
+    """build が返すオブジェクトを保持した状態の割り当て量（バイト）"""
+    now = datetime.utcnow()
+    gc.collect()
+    tracemalloc.start()
+    held = build(count, now)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return current
+
+
+def run(count: int) -> None:
+    from app.services.article_record import records_nbytes
+
+    legacy = _measure(_legacy_cycle, count)
+    record = _measure(_record_cycle, count)
+    estimate = records_nbytes(_record_cycle(count, datetime.utcnow())[0])
+    print(
+        f"articles={count:>7} legacy={legacy / 2**20:>8.2f}MiB record={record / 2**20:>8.2f}MiB "
+        f"saved={(1 - record / legacy) * 100:>5.1f}% records_nbytes={estimate / 2**20:>8.2f}MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, action="append", help="記事数（複数指定可）")
+    args = parser.parse_args()
+    for count in args.articles or DEFAULT_ARTICLE_COUNTS:
+        run(count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""hourly_news_delivery のエンドツーエンドベンチマーク
+
+外部API（RSS / HN / はてブ / Algolia / LINE）を全てローカルのモックサーバーに向け、
+合成ユーザーを投入したDBに対して毎時配信ジョブを1回実行する。
+
+使い方:
+    python -m benchmarks.delivery                       # SQLite, 1k/10k/100k users
+    python -m benchmarks.delivery --users 1000 --users 10000
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.delivery
+
+各ユーザー数は別プロセスで実行し（ピークRSSを独立に計測するため）、
+wall time / 外部リクエスト数 / DBクエリ数 / push throughput / peak RSS を報告する。
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import subprocess
+import tempfile
+from collections import Counter
+from datetime import datetime
+
+DEFAULT_USER_COUNTS = [1_000, 10_000, 100_000]
+DELIVERY_HOUR = 8
+SEED_CHUNK_SIZE = 5_000
+
+
+def _synthetic_rows(user_count: int):
+    """設定空間（配信時間/カテゴリ/言語/設定なし）に散らした合成ユーザー行を生成"""
+    from app.models.user_settings import DEFAULT_CATEGORIES
+
+    languages = ["both", "ja", "en"]
+    now = datetime.utcnow()
+    for i in range(user_count):
+        user_id = f"bench-user-{i:08d}"
+        user = {
+            "id": user_id,
+            "line_user_id": f"U{i:032x}",
+            "display_name": None,
+            "is_active": i % 50 != 0,  # 2%はブロック済み
+            "created_at": now,
+            "updated_at": now,
+        }
+        settings_row = None
+        if i % 5 != 0:  # 20%は設定なし（デフォルト8時）
+            # 9割は配信対象の時間、残りは他の時間に分散
+            hour = DELIVERY_HOUR if i % 10 else (DELIVERY_HOUR + 1 + i) % 24
+            categories = [c for bit, c in enumerate(DEFAULT_CATEGORIES) if (i >> bit) & 1 or i % 4 == 0]
+            settings_row = {
+                "id": f"bench-settings-{i:08d}",
+                "user_id": user_id,
+                "delivery_hour": hour,
+                "categories": json.dumps(categories),
+                "language": languages[i % len(languages)],
+                "updated_at": now,
+            }
+        yield user, settings_row
+
+
+async def _seed(user_count: int) -> None:
+    from sqlalchemy import delete, insert
+    from app.models import Base, User, UserSettings, Favorite, get_engine
+
+    engine = get_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(delete(Favorite.__table__))
+        await conn.execute(delete(UserSettings.__table__))
+        await conn.execute(delete(User.__table__))
+
+    users, settings_rows = [], []
+    for user, settings_row in _synthetic_rows(user_count):
+        users.append(user)
+        if settings_row:
+            settings_rows.append(settings_row)
+        if len(users) >= SEED_CHUNK_SIZE:
+            async with engine.begin() as conn:
+                await conn.execute(insert(User.__table__), users)
+                if settings_rows:
+                    await conn.execute(insert(UserSettings.__table__), settings_rows)
+            users, settings_rows = [], []
+
+    if users:
+        async with engine.begin() as conn:
+            await conn.execute(insert(User.__table__), users)
+            if settings_rows:
+                await conn.execute(insert(UserSettings.__table__), settings_rows)
+
+
+async def _run_once(user_count: int, feed_entries: int, latency: float) -> dict:
+    from sqlalchemy import event
+    from benchmarks import mock_upstream
+
+    upstream = mock_upstream.MockUpstream(feed_entries=feed_entries, latency=latency)
+    base_url = upstream.start()
+    try:
+        mock_upstream.install(base_url)
+
+        from app.models import get_engine
+        from app.services import scheduler
+        from app.services.recipient_index import recipient_index
+
+        seed_started = time.perf_counter()
+        await _seed(user_count)
+        seed_seconds = time.perf_counter() - seed_started
+
+        load_started = time.perf_counter()
+        await recipient_index.load()
+        index_load_seconds = time.perf_counter() - load_started
+
+        engine = get_engine()
+        queries = Counter()
+
+        def _count_query(conn, cursor, statement, parameters, context, executemany):
+            queries[statement.split(None, 1)[0].upper()] += 1
+
+        event.listen(engine.sync_engine, "before_cursor_execute", _count_query)
+
+        # 固定の配信時間でジョブを実行
+        scheduler.datetime = _FixedHourDatetime
+        started = time.perf_counter()
+        await scheduler.hourly_news_delivery()
+        wall_seconds = time.perf_counter() - started
+
+        event.remove(engine.sync_engine, "before_cursor_execute", _count_query)
+
+        requests_by_host = Counter()
+        requests_by_status = {}
+        for key, count in upstream.stats().items():
+            host, status = key.rsplit(" ", 1)
+            requests_by_host[host] += count
+            requests_by_status[key] = count
+        pushes = requests_by_host.get("api.line.me", 0)
+
+        return {
+            "users": user_count,
+            "db": engine.url.get_backend_name(),
+            "seed_s": round(seed_seconds, 3),
+            "index_load_s": round(index_load_seconds, 3),
+            "wall_s": round(wall_seconds, 3),
+            "outbound_requests": sum(requests_by_host.values()),
+            "outbound_by_host": dict(requests_by_host),
+            "outbound_by_status": requests_by_status,
+            "db_queries": sum(queries.values()),
+            "db_queries_by_verb": dict(queries),
+            "pushes": pushes,
+            "push_per_s": round(pushes / wall_seconds, 1) if wall_seconds else 0.0,
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+    finally:
+        from app.services.line_service import close_messaging_api
+
+        await close_messaging_api()
+        upstream.stop()
+
+
+class _FixedHourDatetime:
+    """scheduler内の datetime.now() を配信時間に固定する"""
+
+    @staticmethod
+    def now(tz=None):
+        return datetime.now(tz).replace(hour=DELIVERY_HOUR)
+
+
+def _child(args) -> None:
+    result = asyncio.run(_run_once(args.users[0], args.feed_entries, args.latency))
+    print("BENCH_RESULT " + json.dumps(result, ensure_ascii=False))
+
+
+def _format(result: dict) -> str:
+    return (
+        f"users={result['users']:>7} db={result['db']:<10} wall={result['wall_s']:>9.2f}s "
+        f"outbound={result['outbound_requests']:>8} db_queries={result['db_queries']:>7} "
+        f"push/s={result['push_per_s']:>8.1f} peak_rss={result['peak_rss_mb']:>7.1f}MB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, action="append", help="ユーザー数（複数指定可）")
+    parser.add_argument("--feed-entries", type=int, default=30, help="フィードあたりの記事数")
+    parser.add_argument("--latency", type=float, default=0.0, help="モックサーバーの応答遅延（秒）")
+    parser.add_argument("--json", action="store_true", help="結果をJSON Linesで出力")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args)
+        return
+
+    for user_count in args.users or DEFAULT_USER_COUNTS:
+        env = dict(os.environ)
+        env.setdefault("DEBUG", "false")
+        tmp_db = None
+        if "DATABASE_URL" not in os.environ:
+            tmp_db = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+            tmp_db.close()
+            env["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp_db.name}"
+        env.setdefault("LINE_CHANNEL_ACCESS_TOKEN", "benchmark")
+        # ジョブを直接呼び出すため、リーダー選出は使わない
+        env.setdefault("SCHEDULER_LEADER_ELECTION", "false")
+
+        cmd = [
+            sys.executable, "-m", "benchmarks.delivery", "--child",
+            "--users", str(user_count),
+            "--feed-entries", str(args.feed_entries),
+            "--latency", str(args.latency),
+        ]
+        try:
+            proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+        finally:
+            if tmp_db:
+                os.unlink(tmp_db.name)
+
+        lines = [line for line in proc.stdout.splitlines() if line.startswith("BENCH_RESULT ")]
+        if proc.returncode != 0 or not lines:
+            print(f"users={user_count}: benchmark failed (exit {proc.returncode})", file=sys.stderr)
+            print(proc.stderr[-4000:], file=sys.stderr)
+            continue
+
+        result = json.loads(lines[-1][len("BENCH_RESULT "):])
+        print(json.dumps(result, ensure_ascii=False) if args.json else _format(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""JSONコーデックのマイクロベンチマーク
+
+webhook受信・ユーザー設定・LINE送信の各経路で、従来の処理と
+app.utils.json_codec（標準ライブラリ json / orjson）の1回あたりの時間を比較する。
+  - webhook  : 受信ボディのデコード（従来: json.loads(body.decode())）
+  - settings : UserSettings.get_categories（従来: アクセスごとに json.loads）
+  - outbound : Flex Messageの送信ボディ生成（従来: SDKのpydanticモデル経由）
+
+使い方:
+    python -m benchmarks.json_codec
+    python -m benchmarks.json_codec --iterations 2000
+"""
+import json
+import time
+import argparse
+from datetime import datetime, timedelta
+
+
+def _timeit(func, iterations: int) -> float:
+    """1回あたりの時間（マイクロ秒）"""
+    func()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def _codecs():
+    from app.utils import json_codec
+
+    codecs = {"json": json_codec._StdlibCodec}
+    if json_codec.orjson is not None:
+        codecs["orjson"] = json_codec._OrjsonCodec
+    return codecs
+
+
+def _webhook_body(event_count: int) -> bytes:
+    events = [
+        {
+            "type": "postback",
+            "mode": "active",
+            "timestamp": 1700000000000 + i,
+            "source": {"type": "user", "userId": f"U{i:032x}"},
+            "webhookEventId": f"01H{i:023d}",
+            "deliveryContext": {"isRedelivery": False},
+            "replyToken": f"{i:032x}",
+            "postback": {"data": "action=toggle_category&category=llm"},
+        }
+        for i in range(event_count)
+    ]
+    return json.dumps({"destination": "Uxxxxxxxx", "events": events}).encode("utf-8")
+
+
+def _flex_payloads() -> dict:
+    from app.models.user_settings import UserSettings
+    from app.services.article_record import ArticleRecord
+    from app.utils.flex_message import create_news_carousel, create_settings_menu, create_time_selector
+    from benchmarks.mock_upstream import SYNTHETIC_TITLES
+
+    now = datetime.utcnow()
+    articles = [
+        ArticleRecord(
+            url=f"https://news.example.com/json/{i}",
+            title=SYNTHETIC_TITLES[i % len(SYNTHETIC_TITLES)],
+            summary="生成AIの最新動向についての要約テキスト。" * 3,
+            source="Benchmark",
+            thumbnail_url=f"https://news.example.com/json/{i}.png",
+            published_at=now - timedelta(hours=i),
+            hatena_count=10 * i,
+            hackernews_score=5 * i,
+            reddit_score=0,
+            source_count=1,
+            popularity_score=20 * i,
+        )
+        for i in range(5)
+    ]
+    user_settings = UserSettings(delivery_hour=8, language="both")
+    user_settings.set_categories(["llm", "image"])
+    return {
+        "news_carousel": create_news_carousel(articles),
+        "settings_menu": create_settings_menu(user_settings),
+        "time_selector": create_time_selector(),
+    }
+
+
+def _sdk_push_body(api_client, flex_content: dict) -> bytes:
+    """従来の送信ボディ生成（pydanticモデル化 → 辞書化 → json.dumps）"""
+    from linebot.v3.messaging import FlexContainer, FlexMessage, PushMessageRequest
+
+    request = PushMessageRequest(
+        to="U0",
+        messages=[FlexMessage(alt_text="news", contents=FlexContainer.from_dict(flex_content))],
+    )
+    return json.dumps(api_client.sanitize_for_serialization(request)).encode("utf-8")
+
+
+def _report(case: str, baseline_us: float, results: dict) -> None:
+    columns = " ".join(
+        f"{name}={us:>8.1f}us (x{baseline_us / us:>6.1f})" for name, us in results.items()
+    )
+    print(f"{case:<28} baseline={baseline_us:>9.1f}us {columns}")
+
+
+def run(iterations: int) -> None:
+    from app.models.user_settings import UserSettings
+    from linebot.v3.messaging import ApiClient, Configuration
+    from app.services.line_service import flex_message
+
+    codecs = _codecs()
+    api_client = ApiClient(Configuration(access_token="benchmark"))
+
+    for event_count in (1, 20):
+        body = _webhook_body(event_count)
+        baseline = _timeit(lambda: json.loads(body.decode("utf-8")), iterations)
+        _report(
+            f"webhook events={event_count}",
+            baseline,
+            {name: _timeit(lambda: codec.loads(body), iterations) for name, codec in codecs.items()},
+        )
+
+    user_settings = UserSettings()
+    user_settings.set_categories(["llm", "image", "robotics"])
+    raw = user_settings.categories
+    baseline = _timeit(lambda: json.loads(raw), iterations)
+    _report("settings get_categories", baseline, {"cached": _timeit(user_settings.get_categories, iterations)})
+
+    for name, flex_content in _flex_payloads().items():
+        payload = {"to": "U0", "messages": [flex_message("news", flex_content)]}
+        baseline = _timeit(lambda: _sdk_push_body(api_client, flex_content), max(1, iterations // 10))
+        _report(
+            f"outbound {name}",
+            baseline,
+            {
+                codec_name: _timeit(lambda: codec.dumps_bytes(payload), iterations)
+                for codec_name, codec in codecs.items()
+            },
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=1000, help="計測の繰り返し回数")
+    args = parser.parse_args()
+    run(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
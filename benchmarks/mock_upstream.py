@@ -0,0 +1,204 @@
+"""外部APIのローカルスタンドイン（RSS / HN / はてブ / Algolia / LINE）
+
+ベンチマーク用に、アプリが呼び出す全ての外部エンドポイントを1つのHTTPサーバーで応答する。
+リクエストURLは RewriteTransport により ``http://127.0.0.1:<port>/<元のホスト名><元のパス>``
+に書き換えられるため、サーバーは先頭のパス要素でホストを判別する。
+
+ベンチマーク対象プロセスのGILと競合しないよう、サーバーは別プロセスで起動する。
+ホスト/ステータス別のリクエスト数は ``GET /__stats`` で取得できる。
+"""
+import json
+import time
+import multiprocessing
+from collections import Counter
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.utils.metrics import InstrumentedTransport
+
+# 合成記事のタイトル（カテゴリキーワードと日英を散らす）
+SYNTHETIC_TITLES = [
+    "OpenAI releases new GPT model for enterprise",
+    "Stable Diffusion update improves text-to-image quality",
+    "Waymo expands autonomous robot taxi service",
+    "NVIDIA unveils next-generation GPU for datacenter inference",
+    "Anthropic Claude gains long context window",
+    "新しいLLMが日本語チャットボット性能を更新",
+    "画像生成AIのdiffusionモデルが高速化",
+    "ヒューマノイドrobotの量産が開始",
+    "AI chip startup Groq raises funding",
+    "Llama fine-tuning with RAG in production",
+]
+
+
+def _rss_body(feed_host: str, entries: int) -> bytes:
+    pub_date = formatdate(time.time(), usegmt=True)
+    items = []
+    for i in range(entries):
+        title = f"{SYNTHETIC_TITLES[i % len(SYNTHETIC_TITLES)]} ({feed_host} #{i})"
+        items.append(
+            "<item>"
+            f"<title>{title}</title>"
+            f"<link>https://{feed_host}/articles/{i}</link>"
+            f"<description>&lt;p&gt;{title} summary text.&lt;/p&gt;</description>"
+            f"<pubDate>{pub_date}</pubDate>"
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>{feed_host}</title>{''.join(items)}</channel></rss>"
+    ).encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.stats[f"{self._host} {status}"] += 1
+
+    def _route(self) -> None:
+        parts = urlsplit(self.path)
+        segments = parts.path.lstrip("/").split("/", 1)
+        self._host = segments[0]
+        path = "/" + (segments[1] if len(segments) > 1 else "")
+
+        if self._host == "__stats":
+            body = json.dumps(dict(self.server.stats)).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if self._host == "hacker-news.firebaseio.com":
+            if path.endswith("/topstories.json"):
+                self._send(200, json.dumps(list(range(1, 101))).encode())
+            else:
+                story_id = int(path.rsplit("/", 1)[-1].split(".")[0])
+                story = {
+                    "id": story_id,
+                    "title": SYNTHETIC_TITLES[story_id % len(SYNTHETIC_TITLES)] + f" (HN {story_id})",
+                    "url": f"https://news.example.com/hn/{story_id}",
+                    "time": int(time.time()) - story_id * 60,
+                    "score": story_id * 3,
+                }
+                self._send(200, json.dumps(story).encode())
+        elif self._host == "bookmark.hatenaapis.com":
+            self._send(200, str(len(self.path) % 97).encode(), "text/plain")
+        elif self._host == "hn.algolia.com":
+            hits = [{"points": len(self.path) % 211}]
+            self._send(200, json.dumps({"hits": hits}).encode())
+        elif self._host == "api.line.me":
+            length = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(length)
+            self._send(200, b'{"sentMessages": [{"id": "1", "quoteToken": "mock"}]}')
+        else:
+            # RSSフィード（未知のホストは全てフィードとして扱う）
+            self._send(200, _rss_body(self._host, self.server.feed_entries), "application/rss+xml")
+
+    do_GET = _route
+    do_POST = _route
+
+
+def _serve(port_queue, feed_entries: int, latency: float) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.stats = Counter()
+    server.feed_entries = feed_entries
+    server.latency = latency
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+class MockUpstream:
+    """別プロセスで起動するモックサーバー"""
+
+    def __init__(self, feed_entries: int = 30, latency: float = 0.0):
+        self.feed_entries = feed_entries
+        self.latency = latency
+        self.base_url: Optional[str] = None
+        self._process: Optional[multiprocessing.Process] = None
+
+    def start(self) -> str:
+        port_queue = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=_serve,
+            args=(port_queue, self.feed_entries, self.latency),
+            daemon=True,
+        )
+        self._process.start()
+        self.base_url = f"http://127.0.0.1:{port_queue.get(timeout=10)}"
+        return self.base_url
+
+    def stop(self) -> None:
+        if self._process:
+            self._process.terminate()
+            self._process.join()
+
+    def stats(self) -> dict:
+        """ホスト/ステータス別のリクエスト数 {"<host> <status>": count}"""
+        return httpx.get(f"{self.base_url}/__stats").json()
+
+
+class RewriteTransport(httpx.AsyncBaseTransport):
+    """全ての外部リクエストをモックサーバーへ書き換えるhttpxトランスポート"""
+
+    def __init__(self, base_url: str):
+        self._base = httpx.URL(base_url)
+        self._inner = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        original = request.url
+        request.url = self._base.copy_with(
+            path=f"/{original.host}{original.path}",
+            query=original.query or None,
+        )
+        request.headers["Host"] = self._base.netloc.decode("ascii")
+        return await self._inner.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+def install(base_url: str) -> None:
+    """アプリのhttpxクライアントとLINE APIクライアントをモックサーバーに向ける"""
+    from app.services import line_service
+
+    original_client = httpx.AsyncClient
+
+    class _MockedAsyncClient(original_client):
+        def __init__(self, *args, **kwargs):
+            transport = kwargs.get("transport")
+            if isinstance(transport, InstrumentedTransport):
+                # メトリクス計測はそのまま、送信先だけモックサーバーに差し替える
+                transport.inner = RewriteTransport(base_url)
+            else:
+                kwargs["transport"] = RewriteTransport(base_url)
+            super().__init__(*args, **kwargs)
+
+    httpx.AsyncClient = _MockedAsyncClient
+
+    original_get_messaging_api = line_service.get_messaging_api
+
+    async def _mocked_get_messaging_api():
+        api = await original_get_messaging_api()
+        api.line_base_path = f"{base_url}/api.line.me"
+        return api
+
+    line_service.get_messaging_api = _mocked_get_messaging_api
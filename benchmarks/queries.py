@@ -0,0 +1,257 @@
+"""line_service のDBクエリ数ベンチマーク / N+1検出
+
+シード済みDBに対して line_service の各関数を繰り返し実行し、SQLAlchemyのエンジンイベントで
+1呼び出しあたりのSQL文数とラウンドトリップ数（SQL文 + commit/rollback）を数える。
+レイテンシのパーセンタイルも記録する。
+
+以下のいずれかに該当すると終了コード1で失敗する:
+  - 1呼び出しあたりのSQL文数が QUERY_BUDGETS を超えた
+  - データ量の少ないユーザーと多いユーザーでSQL文数が変わった（N+1の兆候）
+
+使い方:
+    python -m benchmarks.queries
+    python -m benchmarks.queries --users 10000 --iterations 200
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.queries
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from collections import Counter
+from datetime import datetime, timedelta
+
+# 1呼び出しあたりのSQL文数の上限（PER_BATCH_OPERATIONS はバッチ1件あたり）
+QUERY_BUDGETS = {
+    "register_user": 3,
+    "ensure_user_registered": 1,
+    "deactivate_user": 2,
+    "add_favorite": 4,
+    "remove_favorite": 3,
+    "get_user_favorites_page": 1,
+    "get_user_settings": 2,
+    "update_user_delivery_hour": 3,
+    "toggle_user_category": 3,
+    "update_user_language": 3,
+    "get_users_by_delivery_hour": 1,
+    "recipient_index.load": 1,
+}
+
+# バッチごとに1クエリ発行する（呼び出しが返したバッチ数で割って予算と比べる）
+PER_BATCH_OPERATIONS = {"get_users_by_delivery_hour"}
+
+ARTICLE_COUNT = 300
+LIGHT_FAVORITES = 2
+HEAVY_FAVORITES = 200
+
+
+class QueryCounter:
+    """エンジンイベントでSQL文とラウンドトリップを数える"""
+
+    def __init__(self, engine):
+        self.sync_engine = engine.sync_engine
+        self.statements = 0
+        self.round_trips = 0
+        self.verbs = Counter()
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+        self.round_trips += 1
+        self.verbs[statement.split(None, 1)[0].upper()] += 1
+
+    def _on_transaction_end(self, conn):
+        self.round_trips += 1
+
+    def reset(self) -> None:
+        self.statements = 0
+        self.round_trips = 0
+        self.verbs.clear()
+
+    def __enter__(self):
+        from sqlalchemy import event
+
+        event.listen(self.sync_engine, "before_cursor_execute", self._on_execute)
+        event.listen(self.sync_engine, "commit", self._on_transaction_end)
+        event.listen(self.sync_engine, "rollback", self._on_transaction_end)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+
+        event.remove(self.sync_engine, "before_cursor_execute", self._on_execute)
+        event.remove(self.sync_engine, "commit", self._on_transaction_end)
+        event.remove(self.sync_engine, "rollback", self._on_transaction_end)
+
+
+async def _seed_favorites() -> tuple:
+    """記事とお気に入りを投入し、(軽量ユーザー, 大量お気に入りユーザー) のLINE IDを返す"""
+    from sqlalchemy import delete, insert, select
+    from app.models import Article, Favorite, User, get_engine
+
+    now = datetime.utcnow()
+    async with get_engine().begin() as conn:
+        await conn.execute(delete(Favorite.__table__))
+        await conn.execute(delete(Article.__table__))
+        await conn.execute(insert(Article.__table__), [
+            {
+                "id": f"bench-article-{i:06d}",
+                "url": f"https://news.example.com/bench/{i}",
+                "title": f"Benchmark article {i}",
+                "summary": "",
+                "source": "Benchmark",
+                "popularity_score": i,
+                "published_at": now - timedelta(minutes=i),
+                "fetched_at": now,
+            }
+            for i in range(ARTICLE_COUNT)
+        ])
+
+        result = await conn.execute(
+            select(User.id, User.line_user_id).where(User.is_active == True).order_by(User.id).limit(2)
+        )
+        (light_id, light_line_id), (heavy_id, heavy_line_id) = result.all()
+
+        favorites = []
+        for user_id, count in ((light_id, LIGHT_FAVORITES), (heavy_id, HEAVY_FAVORITES)):
+            for i in range(count):
+                favorites.append({
+                    "id": f"bench-fav-{user_id}-{i}",
+                    "user_id": user_id,
+                    "article_id": f"bench-article-{i:06d}",
+                    "created_at": now - timedelta(seconds=i),
+                })
+        await conn.execute(insert(Favorite.__table__), favorites)
+
+    return light_line_id, heavy_line_id
+
+
+def _operations(light_user: str, heavy_user: str, iterations: int):
+    """(関数名, バリアント, 呼び出しファクトリ) の一覧"""
+    from app.services import line_service as ls
+    from app.services.recipient_index import recipient_index
+
+    async def drain(hour):
+        batches = 0
+        async for _ in ls.get_users_by_delivery_hour(hour):
+            batches += 1
+        return batches
+
+    ops = []
+    for variant, user in (("light", light_user), ("heavy", heavy_user)):
+        # お気に入り済み件数より後ろの記事を使い、毎回新規追加→削除になるようにする
+        fav_offset = HEAVY_FAVORITES
+        ops += [
+            ("register_user", variant, lambda i, u=user: ls.register_user(u)),
+            ("ensure_user_registered", variant, lambda i, u=user: ls.ensure_user_registered(u)),
+            ("add_favorite", variant,
+             lambda i, u=user: ls.add_favorite(u, f"bench-article-{fav_offset + i % (ARTICLE_COUNT - fav_offset):06d}")),
+            ("remove_favorite", variant,
+             lambda i, u=user: ls.remove_favorite(u, f"bench-article-{fav_offset + i % (ARTICLE_COUNT - fav_offset):06d}")),
+            ("get_user_favorites_page", variant, lambda i, u=user: ls.get_user_favorites_page(u)),
+            ("get_user_settings", variant, lambda i, u=user: ls.get_user_settings(u)),
+            ("update_user_delivery_hour", variant, lambda i, u=user: ls.update_user_delivery_hour(u, 8)),
+            ("toggle_user_category", variant, lambda i, u=user: ls.toggle_user_category(u, "llm")),
+            ("update_user_language", variant,
+             lambda i, u=user: ls.update_user_language(u, ("ja", "en", "both")[i % 3])),
+            ("deactivate_user", variant, lambda i, u=user: ls.deactivate_user(u)),
+        ]
+    ops += [
+        ("get_users_by_delivery_hour", "hour=9", lambda i: drain(9)),
+        ("get_users_by_delivery_hour", "hour=8", lambda i: drain(8)),
+        ("recipient_index.load", "all", lambda i: recipient_index.load()),
+    ]
+    return ops
+
+
+def _percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(user_count: int, iterations: int) -> int:
+    from benchmarks.delivery import _seed
+    from app.models import get_engine
+
+    await _seed(user_count)
+    light_user, heavy_user = await _seed_favorites()
+
+    failures = []
+    statements_by_op = {}
+
+    print(f"{'operation':<28} {'variant':<8} {'stmts':>5} {'trips':>5} {'budget':>6} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+
+    with QueryCounter(get_engine()) as counter:
+        for name, variant, factory in _operations(light_user, heavy_user, iterations):
+            max_statements = 0
+            max_round_trips = 0
+            latencies = []
+            loop_count = iterations if name != "recipient_index.load" else max(1, iterations // 10)
+            for i in range(loop_count):
+                counter.reset()
+                started = time.perf_counter()
+                result = await factory(i)
+                latencies.append((time.perf_counter() - started) * 1000)
+                statements = counter.statements
+                if name in PER_BATCH_OPERATIONS:
+                    statements = -(-statements // max(1, result))
+                max_statements = max(max_statements, statements)
+                max_round_trips = max(max_round_trips, counter.round_trips)
+
+            # deactivate_user の後は次のバリアントのために再有効化
+            if name == "deactivate_user":
+                from app.services.line_service import register_user
+                await register_user(light_user if variant == "light" else heavy_user)
+
+            budget = QUERY_BUDGETS[name]
+            statements_by_op.setdefault(name, {})[variant] = max_statements
+            print(f"{name:<28} {variant:<8} {max_statements:>5} {max_round_trips:>5} {budget:>6} "
+                  f"{_percentile(latencies, 50):>8.2f} {_percentile(latencies, 95):>8.2f} "
+                  f"{_percentile(latencies, 99):>8.2f}")
+
+            if max_statements > budget:
+                failures.append(f"{name} [{variant}]: {max_statements} statements > budget {budget}")
+
+    # N+1検出: データ量でSQL文数が増えないこと
+    for name, variants in statements_by_op.items():
+        if "light" in variants and variants["heavy"] > variants["light"]:
+            failures.append(
+                f"{name}: statements grow with data size "
+                f"(light={variants['light']}, heavy={variants['heavy']}) - possible N+1"
+            )
+
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+
+    print("\nAll operations within query budget")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000, help="シードするユーザー数")
+    parser.add_argument("--iterations", type=int, default=50, help="関数ごとの実行回数")
+    args = parser.parse_args()
+
+    tmp_db = None
+    if "DATABASE_URL" not in os.environ:
+        tmp_db = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        tmp_db.close()
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp_db.name}"
+    os.environ.setdefault("DEBUG", "false")
+
+    try:
+        exit_code = asyncio.run(run(args.users, args.iterations))
+    finally:
+        if tmp_db:
+            os.unlink(tmp_db.name)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
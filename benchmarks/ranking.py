@@ -0,0 +1,141 @@
+"""ランキング処理のマイクロベンチマーク
+
+合成したスコアリング済み記事に対して、従来方式（記事ごとにPythonで重み計算 →
+filter_articles → 全件ソート）と RankingEngine（列指向 + argpartition）で
+全セグメント（カテゴリの組み合わせ × 言語）のTop Nを求める時間を比較する。
+--weights で重みを変えたときの上位記事の入れ替わりも確認できる。
+
+使い方:
+    python -m benchmarks.ranking
+    python -m benchmarks.ranking --articles 500 --articles 5000
+    python -m benchmarks.ranking --weights hatena=1,hackernews=4 --half-life 6
+"""
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+DEFAULT_ARTICLE_COUNTS = [500, 5_000, 50_000]
+TOP_N = 5
+
+
+def _synthetic_articles(count: int, seed: int = 0):
+    from app.services.article_record import ArticleRecord
+    from benchmarks.mock_upstream import SYNTHETIC_TITLES
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    return [
+        ArticleRecord(
+            url=f"https://news.example.com/rank/{i}",
+            title=f"{SYNTHETIC_TITLES[i % len(SYNTHETIC_TITLES)]} #{i}",
+            summary="",
+            source="Benchmark",
+            thumbnail_url="",
+            published_at=now - timedelta(minutes=rng.randrange(24 * 60)),
+            hatena_count=int(rng.paretovariate(1.5)) - 1,
+            hackernews_score=int(rng.paretovariate(1.2)) - 1,
+            reddit_score=0,
+            source_count=1 + (rng.random() < 0.1) + (rng.random() < 0.02),
+            popularity_score=0,
+        )
+        for i in range(count)
+    ]
+
+
+def _segments():
+    from app.models.user_settings import CATEGORY_BITS
+
+    full_mask = sum(CATEGORY_BITS.values())
+    return [(mask, language) for mask in range(1, full_mask + 1) for language in ("both", "ja", "en")]
+
+
+def _baseline(articles, segments, weights):
+    """従来方式: 記事ごとに重み計算し、セグメントごとにフィルタ + 全件ソート"""
+    from app.models.user_settings import mask_to_categories
+    from app.services.social_scorer import filter_articles
+
+    for article in articles:
+        article.popularity_score = int(
+            article.hatena_count * weights["hatena"]
+            + article.hackernews_score * weights["hackernews"]
+            + article.reddit_score * weights["reddit"]
+            + (article.source_count - 1) * weights["source_count"]
+        )
+    ranked = sorted(articles, key=lambda a: a.popularity_score, reverse=True)
+    return {
+        (mask, language): filter_articles(ranked, mask_to_categories(mask), language)[:TOP_N]
+        for mask, language in segments
+    }
+
+
+def _parse_weights(text: str) -> dict:
+    from app.services.social_scorer import WEIGHTS
+
+    weights = dict(WEIGHTS)
+    for pair in filter(None, text.split(",")):
+        key, value = pair.split("=", 1)
+        if key not in weights:
+            raise SystemExit(f"unknown weight: {key} (choose from {', '.join(WEIGHTS)})")
+        weights[key] = float(value)
+    return weights
+
+
+def run(article_count: int, weights: dict, half_life: float) -> None:
+    from app.services.ranking import RankingEngine
+    from app.services.social_scorer import WEIGHTS
+
+    articles = _synthetic_articles(article_count)
+    segments = _segments()
+
+    started = time.perf_counter()
+    baseline_top = _baseline(articles, segments, WEIGHTS)
+    baseline_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    engine = RankingEngine(articles)
+    build_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    default_top = engine.top_by_segment(TOP_N, segments, half_life_hours=half_life)
+    rank_s = time.perf_counter() - started
+
+    # 減衰なしなら従来方式と同じスコア列になること（同点の選ばれ方は問わない）
+    undecayed_top = engine.top_by_segment(TOP_N, segments, half_life_hours=0)
+    engine_scores = engine.weighted_scores()
+    index_of = {id(a): i for i, a in enumerate(articles)}
+    mismatched = [
+        s for s in segments
+        if [a.popularity_score for a in baseline_top[s]]
+        != [int(engine_scores[index_of[id(a)]]) for a in undecayed_top[s]]
+    ]
+    if mismatched:
+        raise SystemExit(f"ranking mismatch against baseline in segments: {mismatched[:5]}")
+
+    tuned_top = engine.top_by_segment(TOP_N, segments, weights=weights, half_life_hours=half_life)
+    changed = sum(
+        len({a.url for a in default_top[s]} ^ {a.url for a in tuned_top[s]}) // 2 for s in segments
+    )
+
+    print(
+        f"articles={article_count:>7} segments={len(segments):>3} "
+        f"baseline={baseline_s * 1000:>9.1f}ms engine_build={build_s * 1000:>9.1f}ms "
+        f"engine_rank={rank_s * 1000:>7.1f}ms "
+        f"top{TOP_N}_changed_by_weights={changed}/{len(segments) * TOP_N}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, action="append", help="記事数（複数指定可）")
+    parser.add_argument("--weights", default="", help="比較用の重み（例: hatena=1,hackernews=4）")
+    parser.add_argument("--half-life", type=float, default=24.0, help="時間減衰の半減期（時間、0で減衰なし）")
+    args = parser.parse_args()
+
+    weights = _parse_weights(args.weights)
+    for article_count in args.articles or DEFAULT_ARTICLE_COUNTS:
+        run(article_count, weights, args.half_life)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""baseline schema (create_all時点のテーブル)
+
+既存のDB（create_allで作成済み）は init_db() がこのリビジョンにstampしてから
+以降のマイグレーションを適用する。
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(64), primary_key=True),
+        sa.Column("line_user_id", sa.String(64), nullable=False),
+        sa.Column("display_name", sa.String(256), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_users_line_user_id", "users", ["line_user_id"], unique=True)
+
+    op.create_table(
+        "articles",
+        sa.Column("id", sa.String(64), primary_key=True),
+        sa.Column("url", sa.String(2048), nullable=False),
+        sa.Column("title", sa.String(512), nullable=False),
+        sa.Column("summary", sa.Text(), nullable=True),
+        sa.Column("source", sa.String(128), nullable=True),
+        sa.Column("thumbnail_url", sa.String(2048), nullable=True),
+        sa.Column("popularity_score", sa.Integer(), nullable=True),
+        sa.Column("hatena_count", sa.Integer(), nullable=True),
+        sa.Column("hackernews_score", sa.Integer(), nullable=True),
+        sa.Column("reddit_score", sa.Integer(), nullable=True),
+        sa.Column("source_count", sa.Integer(), nullable=True),
+        sa.Column("published_at", sa.DateTime(), nullable=True),
+        sa.Column("fetched_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_articles_popularity_score", "articles", ["popularity_score"])
+    op.create_index("ix_articles_url", "articles", ["url"], unique=True)
+
+    op.create_table(
+        "favorites",
+        sa.Column("id", sa.String(64), primary_key=True),
+        sa.Column("user_id", sa.String(64), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("article_id", sa.String(64), sa.ForeignKey("articles.id"), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("user_id", "article_id", name="uq_user_article"),
+    )
+    op.create_index("ix_favorites_article_id", "favorites", ["article_id"])
+    op.create_index("ix_favorites_user_id", "favorites", ["user_id"])
+
+    op.create_table(
+        "user_settings",
+        sa.Column("id", sa.String(64), primary_key=True),
+        sa.Column("user_id", sa.String(64), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("delivery_hour", sa.Integer(), nullable=True),
+        sa.Column("categories", sa.Text(), nullable=True),
+        sa.Column("language", sa.String(10), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_user_settings_user_id", "user_settings", ["user_id"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_table("user_settings")
+    op.drop_table("favorites")
+    op.drop_table("articles")
+    op.drop_table("users")
@@ -0,0 +1,73 @@
+"""indexes for hot queries in line_service / scheduler
+
+- user_settings (delivery_hour, user_id): get_users_by_delivery_hour の配信時間絞り込み
+- users (id, line_user_id) WHERE is_active: アクティブユーザーのみの部分インデックス
+  （設定なしユーザーの外部結合と配信対象インデックスの読み込み）
+- favorites (user_id, created_at, id): お気に入りのキーセットページング
+- articles (published_at): 公開日時での範囲検索・保持期間による削除
+- favorites (user_id) は uq_user_article と上記複合インデックスの先頭列と重複するため削除
+
+PostgreSQLでは CREATE INDEX CONCURRENTLY で作成し、書き込みをブロックしない。
+
+Revision ID: 0002_hot_query_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_hot_query_indexes"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+# (インデックス名, テーブル, カラム, 追加オプション)
+INDEXES = [
+    ("ix_user_settings_delivery_hour_user", "user_settings", ["delivery_hour", "user_id"], {}),
+    (
+        "ix_users_active",
+        "users",
+        ["id", "line_user_id"],
+        {
+            # SQLAlchemyが出力する条件式と一致させる（部分インデックスを使わせるため）
+            "postgresql_where": sa.text("is_active = true"),
+            "sqlite_where": sa.text("is_active = 1"),
+        },
+    ),
+    ("ix_favorites_user_created_id", "favorites", ["user_id", "created_at", "id"], {}),
+    ("ix_articles_published_at", "articles", ["published_at"], {}),
+]
+
+
+def _is_postgresql() -> bool:
+    return op.get_context().dialect.name == "postgresql"
+
+
+def upgrade() -> None:
+    if _is_postgresql():
+        # CONCURRENTLYはトランザクション外でのみ実行可能
+        with op.get_context().autocommit_block():
+            for name, table, columns, options in INDEXES:
+                op.create_index(
+                    name, table, columns,
+                    postgresql_concurrently=True, if_not_exists=True, **options,
+                )
+            op.drop_index("ix_favorites_user_id", table_name="favorites",
+                          postgresql_concurrently=True, if_exists=True)
+    else:
+        for name, table, columns, options in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, **options)
+        op.drop_index("ix_favorites_user_id", table_name="favorites", if_exists=True)
+
+
+def downgrade() -> None:
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            op.create_index("ix_favorites_user_id", "favorites", ["user_id"],
+                            postgresql_concurrently=True, if_not_exists=True)
+            for name, table, _, _ in reversed(INDEXES):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    else:
+        op.create_index("ix_favorites_user_id", "favorites", ["user_id"], if_not_exists=True)
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True)
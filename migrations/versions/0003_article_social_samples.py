@@ -0,0 +1,34 @@
+"""article_social_samples: time series of social counts for trending scores
+
+Revision ID: 0003_article_social_samples
+Revises: 0002_hot_query_indexes
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_article_social_samples"
+down_revision = "0002_hot_query_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "article_social_samples",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("article_id", sa.String(64), nullable=False),
+        sa.Column("ts", sa.DateTime(), nullable=False),
+        sa.Column("hatena", sa.Integer(), nullable=False),
+        sa.Column("hn", sa.Integer(), nullable=False),
+    )
+    op.create_index(
+        "ix_article_social_samples_article_ts", "article_social_samples", ["article_id", "ts"]
+    )
+    op.create_index("ix_article_social_samples_ts", "article_social_samples", ["ts"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_article_social_samples_ts", table_name="article_social_samples")
+    op.drop_index("ix_article_social_samples_article_ts", table_name="article_social_samples")
+    op.drop_table("article_social_samples")
@@ -0,0 +1,27 @@
+"""scheduler_leases: lease row for scheduler leader election (non-PostgreSQL)
+
+Revision ID: 0004_scheduler_leases
+Revises: 0003_article_social_samples
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_scheduler_leases"
+down_revision = "0003_article_social_samples"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "scheduler_leases",
+        sa.Column("name", sa.String(64), primary_key=True),
+        sa.Column("holder", sa.String(128), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("scheduler_leases")
@@ -0,0 +1,27 @@
+"""webhook_events: processed webhookEventId for redelivery deduplication
+
+Revision ID: 0005_webhook_events
+Revises: 0004_scheduler_leases
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_webhook_events"
+down_revision = "0004_scheduler_leases"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "webhook_events",
+        sa.Column("event_id", sa.String(64), primary_key=True),
+        sa.Column("received_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_webhook_events_received_at", "webhook_events", ["received_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_webhook_events_received_at", table_name="webhook_events")
+    op.drop_table("webhook_events")
@@ -0,0 +1,31 @@
+"""delivery_histories: per-user rolling Bloom filter of delivered articles
+
+Revision ID: 0006_delivery_histories
+Revises: 0005_webhook_events
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_delivery_histories"
+down_revision = "0005_webhook_events"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "delivery_histories",
+        sa.Column("line_user_id", sa.String(64), primary_key=True),
+        sa.Column("current_bits", sa.LargeBinary(), nullable=False),
+        sa.Column("previous_bits", sa.LargeBinary(), nullable=True),
+        sa.Column("current_count", sa.Integer(), nullable=False),
+        sa.Column("rotated_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_delivery_histories_updated_at", "delivery_histories", ["updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_delivery_histories_updated_at", table_name="delivery_histories")
+    op.drop_table("delivery_histories")
@@ -0,0 +1,22 @@
+"""scheduler_leases.last_run_slot: marker of the last scheduled slot that ran
+
+Revision ID: 0007_scheduler_last_run
+Revises: 0006_delivery_histories
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_scheduler_last_run"
+down_revision = "0006_delivery_histories"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("scheduler_leases", sa.Column("last_run_slot", sa.String(32), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("scheduler_leases") as batch_op:
+        batch_op.drop_column("last_run_slot")